@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Throughput benchmarks of resource parsing.
+
+Run from repository root: python -m benchmarks.bench <benchmark> [options]
+"""
+
+import argparse
+import random
+import time
+import timeit
+
+
+def bench_chunks(args: argparse.Namespace) -> None:
+    from nutcracker.kernel2.chunk import (
+        ChunkSettings,
+        IFFChunkHeader,
+        IFFStructChunkHeader,
+        mktag,
+        read_chunks,
+        scan_chunks,
+        write_chunks,
+    )
+
+    synthetic = ChunkSettings(IFFChunkHeader, alignment=1, inclheader=True)
+    buffers = {
+        'synthetic': memoryview(
+            write_chunks(
+                synthetic,
+                (mktag(synthetic, 'DATA', bytes(idx % 8)) for idx in range(args.count)),
+            ),
+        ),
+    }
+    for filename in args.files:
+        with open(filename, 'rb') as f:
+            buffers[filename] = memoryview(f.read())
+
+    walks = {
+        'read_chunks': lambda cfg, buffer: sum(1 for _ in read_chunks(cfg, buffer)),
+        'scan_chunks': lambda cfg, buffer: len(scan_chunks(cfg, buffer)),
+    }
+    for name, buffer in buffers.items():
+        for header_dtype in (IFFChunkHeader, IFFStructChunkHeader):
+            cfg = ChunkSettings(header_dtype, alignment=1, inclheader=True)
+            for walk, count_chunks in walks.items():
+                best = float('inf')
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    count = count_chunks(cfg, buffer)
+                    best = min(best, time.perf_counter() - start)
+                print(
+                    f'{name}: {header_dtype.__name__}: {walk}: '
+                    f'{count / best:,.0f} headers/sec',
+                )
+
+
+def bench_index(args: argparse.Namespace) -> None:
+    from nutcracker.sputm.index import compare_pid_off
+
+    directory = {
+        gid: (random.randrange(1, args.rooms), random.randrange(1 << 24))
+        for gid in range(args.entries)
+    }
+    probes = random.sample(list(directory.values()), min(1000, args.entries))
+
+    def linear(pid: int, data: bytes, off: int) -> int | None:
+        return next((k for k, v in directory.items() if v == (pid, off)), None)
+
+    for name, get_gid in (('linear', linear), ('lookup', compare_pid_off(directory))):
+        duration = min(
+            timeit.repeat(
+                lambda get_gid=get_gid: [get_gid(pid, b'', off) for pid, off in probes],
+                number=1,
+                repeat=args.repeat,
+            ),
+        )
+        print(f'{name}: {len(probes) / duration:.0f} lookups/sec')
+
+    if args.filename:
+        from nutcracker.kernel2.index import expand
+        from nutcracker.sputm.tree import open_game_resource
+
+        gameres = open_game_resource(args.filename)
+        duration = timeit.timeit(
+            lambda: expand(gameres.read_resources(use_index=False)),
+            number=1,
+        )
+        print(f'mapped {gameres.basename} in {duration:.2f}s')
+
+
+def bench_bytecode(args: argparse.Namespace) -> None:
+    from collections.abc import Iterable, Iterator
+
+    from nutcracker.kernel2.element import Element
+    from nutcracker.sputm.schema import SCHEMA
+    from nutcracker.sputm.script.bytecode import descumm_iter
+    from nutcracker.sputm.script.decoder import CompiledOpTable, get_compiled
+    from nutcracker.sputm.strings import get_optable, get_script_map
+    from nutcracker.sputm.tree import narrow_schema, open_game_resource
+
+    gameres = open_game_resource(args.filename)
+    opcodes = get_optable(gameres.game)
+    script_map = get_script_map(gameres.game)
+    root = gameres.read_resources(
+        schema=narrow_schema(
+            SCHEMA,
+            {'LECF', 'LFLF', 'RMDA', 'ROOM', 'OBCD', *script_map},
+        ),
+    )
+
+    def iter_scripts(elems: Iterable[Element]) -> Iterator[bytes]:
+        for elem in elems:
+            if elem.tag in script_map:
+                yield bytes(script_map[elem.tag](elem.data)[1])
+            elif elem.tag in {'LECF', 'LFLF', 'RMDA', 'ROOM', 'OBCD'}:
+                yield from iter_scripts(elem.children())
+
+    scripts = list(iter_scripts(root))
+    size = sum(len(data) for data in scripts)
+    print(f'{len(scripts)} scripts, {size} bytes')
+
+    for name, compiled in (
+        ('stream', CompiledOpTable({}, {})),
+        ('table', get_compiled(opcodes)),
+    ):
+        duration = min(
+            timeit.repeat(
+                lambda compiled=compiled: [
+                    dict(descumm_iter(data, opcodes, compiled=compiled))
+                    for data in scripts
+                ],
+                number=1,
+                repeat=args.repeat,
+            ),
+        )
+        print(f'{name}: {size / duration / 1e6:.2f} MB/sec')
+
+
+def bench_smap(args: argparse.Namespace) -> None:
+    import io
+    from collections import defaultdict
+
+    from nutcracker.codex.smap import (
+        decode_basic,
+        decode_he,
+        decode_run_majmin,
+        get_method_info,
+        split_strips,
+    )
+    from nutcracker.sputm.preset import sputm
+    from nutcracker.sputm.room.pproom import get_rooms, read_room_settings
+    from nutcracker.sputm.tree import open_game_resource
+
+    gameres = open_game_resource(args.filename)
+    root = gameres.read_resources()
+
+    strips = defaultdict(list)
+    for disk in root:
+        for lflf in get_rooms(disk.children()):
+            header, _, _, rmim = read_room_settings(lflf)
+            if rmim.tag != 'RMIM':
+                continue
+            for imxx in sputm.findall('IM{:02x}', rmim):
+                smap = sputm.find('SMAP', imxx)
+                if smap is None:
+                    continue
+                for strip in split_strips(header.width, bytes(smap.data)):
+                    method, _, _, palen = get_method_info(strip[0])
+                    if method in {decode_basic, decode_run_majmin, decode_he}:
+                        size = 8 * header.height
+                        strips[method].append((strip[1:], size, palen))
+
+    for method, items in strips.items():
+        pixels = sum(size for _, size, _ in items)
+        duration = min(
+            timeit.repeat(
+                lambda method=method, items=items: [
+                    method(io.BytesIO(data), size, palen) for data, size, palen in items
+                ],
+                number=1,
+                repeat=args.repeat,
+            ),
+        )
+        print(
+            f'{method.__name__}: {len(items)} strips, '
+            f'{pixels / duration / 1e6:.2f} Mpx/sec',
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='benchmark resource parsing')
+    parser.add_argument('--repeat', default=3, type=int, help='best of N runs')
+    benchmarks = parser.add_subparsers(dest='benchmark', required=True)
+
+    chunks = benchmarks.add_parser('chunks', help='chunk header parsing')
+    chunks.add_argument('files', nargs='*', help='files to scan top level chunks of')
+    chunks.add_argument('--count', default=200000, type=int, help='synthetic headers')
+    chunks.set_defaults(run=bench_chunks)
+
+    index = benchmarks.add_parser('index', help='resource id lookup')
+    index.add_argument('filename', nargs='?', help='map game resources by index file')
+    index.add_argument('--entries', default=30000, type=int, help='directory size')
+    index.add_argument('--rooms', default=200, type=int, help='rooms in directory')
+    index.set_defaults(run=bench_index)
+
+    bytecode = benchmarks.add_parser('bytecode', help='script bytecode decoding')
+    bytecode.add_argument('filename', help='game resource index file')
+    bytecode.set_defaults(run=bench_bytecode)
+
+    smap = benchmarks.add_parser('smap', help='SMAP strip decoding')
+    smap.add_argument('filename', help='game resource index file')
+    smap.set_defaults(run=bench_smap)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == '__main__':
+    main()
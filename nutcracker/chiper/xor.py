@@ -1,20 +1,101 @@
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import cache, partial
 from typing import IO
 
+import numpy as np
+
+from nutcracker.kernel2.fileio import XorBuffer
+
 CHIPER_KEY = 0x69
+BLOCK_SIZE = 1 << 20
+
+Data = bytes | bytearray | memoryview | XorBuffer
+
+
+@cache
+def _translation(key: int) -> bytes:
+    return bytes(b ^ key for b in range(256))
+
+
+def encode(data: Data, key: int = CHIPER_KEY) -> bytes:
+    return bytes(data).translate(_translation(key))
+
+
+def _encode_nogil(data: Data, key: int = CHIPER_KEY) -> bytes:
+    # numpy releases the GIL while xoring, unlike bytes.translate
+    return (np.frombuffer(data, dtype=np.uint8) ^ np.uint8(key)).tobytes()
+
+
+def encode_blocks(
+    data: Data,
+    key: int = CHIPER_KEY,
+    block_size: int = BLOCK_SIZE,
+    executor: Executor | None = None,
+) -> Iterator[bytes]:
+    """XOR data in fixed-size blocks, spread over `executor` threads when given."""
+    view = memoryview(data).cast('B')
+    blocks = (view[pos : pos + block_size] for pos in range(0, len(view), block_size))
+    if executor is None:
+        yield from (encode(block, key=key) for block in blocks)
+        return
+    yield from executor.map(partial(_encode_nogil, key=key), blocks)
+
+
+def encode_stream(
+    chunks: Iterable[Data],
+    key: int = CHIPER_KEY,
+    block_size: int = BLOCK_SIZE,
+    workers: int = 1,
+) -> Iterator[bytes]:
+    with ExitStack() as stack:
+        # blocks of all chunks are encoded by the same worker threads
+        executor = (
+            stack.enter_context(ThreadPoolExecutor(workers)) if workers > 1 else None
+        )
+        for chunk in chunks:
+            if isinstance(chunk, XorBuffer) and chunk.key == key:
+                # lazily decrypted resource, source is already encoded
+                yield chunk.encrypted()
+                continue
+            yield from encode_blocks(
+                chunk,
+                key=key,
+                block_size=block_size,
+                executor=executor,
+            )
 
 
 def read(stream: IO[bytes], size: int | None = None, key: int = CHIPER_KEY) -> bytes:
     # None reads until EOF
-    return bytes(b ^ key for b in stream.read(size))  # type: ignore[arg-type]
+    return encode(stream.read(size), key=key)  # type: ignore[arg-type]
+
+
+def write(
+    stream: IO[bytes],
+    data: Data,
+    key: int = CHIPER_KEY,
+    workers: int = 1,
+) -> int:
+    return write_stream(stream, (data,), key=key, workers=workers)
 
 
-def write(stream: IO[bytes], data: bytes, key: int = CHIPER_KEY) -> int:
-    return stream.write(bytes(b ^ key for b in data))
+def write_stream(
+    stream: IO[bytes],
+    chunks: Iterable[Data],
+    key: int = CHIPER_KEY,
+    workers: int = 1,
+) -> int:
+    if not key:
+        return sum(stream.write(chunk) for chunk in chunks)
+    return sum(
+        stream.write(block) for block in encode_stream(chunks, key=key, workers=workers)
+    )
 
 
 if __name__ == '__main__':
     import argparse
-    from functools import partial
 
     from nutcracker.utils import copyio
 
@@ -22,10 +103,13 @@ if __name__ == '__main__':
     parser.add_argument('filename', help='filename to read from')
     parser.add_argument('output', help='filename to read from')
     parser.add_argument('-c', '--chiper-key', default='0x69', type=str, help='xor key')
+    parser.add_argument('-j', '--jobs', default=1, type=int, help='worker threads')
     args = parser.parse_args()
 
     with open(args.filename, 'rb') as infile, open(args.output, 'wb') as outfile:
-        for buffer in copyio.buffered(
-            partial(read, infile, key=int(args.chiper_key, 16)),
-        ):
-            outfile.write(buffer)
+        write_stream(
+            outfile,
+            copyio.buffered(infile.read, buffer_size=BLOCK_SIZE * max(args.jobs, 1)),
+            key=int(args.chiper_key, 16),
+            workers=args.jobs,
+        )
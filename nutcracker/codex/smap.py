@@ -1,14 +1,35 @@
 import io
 import itertools
+import zlib
 from collections.abc import Sequence
-from functools import partial
+from concurrent.futures import Executor
+from enum import Enum
+from functools import cache, partial
 
 import numpy as np
 
-from nutcracker.utils.funcutils import grouper
-
 TRANSPARENCY = 255
 
+WORD_SIZE = 8
+WORD_MASK = (1 << 8 * WORD_SIZE) - 1
+LUT_BITS = 8
+
+RAW_CODE = 0x01
+RAW_CODE_TR = 0x95
+
+# first codes of compression method families, palette length is added to them
+CODE_FAMILIES = (10, 20, 30, 40, 60, 80, 100, 120, 130, 140)
+MIN_PALEN = 4
+MAX_PALEN = 8
+
+# longest repeat written as zero bits instead of run code, see `encode_run_majmin`
+RUN_LIMITS = (12, 255)
+
+# strips sent to worker processes at once
+STRIP_CHUNK_SIZE = 8
+
+SAMPLE_RATE = 16
+
 
 def read_uint16le(stream):
     return int.from_bytes(stream.read(2), byteorder='little', signed=False)
@@ -22,133 +43,213 @@ def to_byte(num):
     return bytes([num % 256])
 
 
-def create_bitsream(stream):
-    sd = stream.read()
-    bits = ''.join(f'{x:08b}'[::-1] for x in sd)
-    return (int(x) for x in bits)
+class BitReader:
+    """LSB first bit reader, buffering data a word at a time.
+
+    Reading past the end of data yields zero bits,
+    `overrun` tells whether more bits were consumed than available.
+    """
+
+    __slots__ = ('data', 'pos', 'acc', 'nbits')
+
+    def __init__(self, data: bytes) -> None:
+        self.data = bytes(data)
+        self.pos = 0
+        self.acc = 0
+        self.nbits = 0
+
+    def peek(self, count: int) -> int:
+        if self.nbits < count:
+            chunk = self.data[self.pos : self.pos + WORD_SIZE]
+            self.pos += WORD_SIZE
+            self.acc |= int.from_bytes(chunk, byteorder='little') << self.nbits
+            # missing bytes at end of data are read as zero bits
+            self.nbits += 8 * WORD_SIZE
+        return self.acc & ((1 << count) - 1)
+
+    def skip(self, count: int) -> None:
+        self.acc >>= count
+        self.nbits -= count
+
+    def read(self, count: int) -> int:
+        value = self.peek(count)
+        self.skip(count)
+        return value
+
+    @property
+    def overrun(self) -> bool:
+        return 8 * self.pos - self.nbits > 8 * len(self.data)
+
+
+class BitWriter:
+    """LSB first bit writer, flushing a word at a time into a preallocated buffer."""
+
+    __slots__ = ('buffer', 'pos', 'acc', 'nbits')
+
+    def __init__(self, capacity: int) -> None:
+        self.buffer = bytearray(capacity)
+        self.pos = 0
+        self.acc = 0
+        self.nbits = 0
+
+    def write(self, value: int, count: int) -> None:
+        self.acc |= value << self.nbits
+        self.nbits += count
+        while self.nbits >= 8 * WORD_SIZE:
+            end = self.pos + WORD_SIZE
+            self.buffer[self.pos : end] = (self.acc & WORD_MASK).to_bytes(
+                WORD_SIZE,
+                byteorder='little',
+            )
+            self.pos = end
+            self.acc >>= 8 * WORD_SIZE
+            self.nbits -= 8 * WORD_SIZE
+
+    def getvalue(self) -> bytes:
+        """Written bits, last byte padded with zero bits."""
+        nbytes = (self.nbits + 7) // 8
+        end = self.pos + nbytes
+        self.buffer[self.pos : end] = self.acc.to_bytes(nbytes, byteorder='little')
+        return bytes(self.buffer[:end])
+
+
+# ops of lookup table entries for short codes
+OP_SAME, OP_NEW, OP_DELTA, OP_SUB, OP_FLIP, OP_RUN = range(6)
+
+# (op, code length, argument) indexed by next `bits` of the stream
+CodeTable = tuple[Sequence[tuple[int, int, int]], int]
+
+HE_DELTA_COLOR = (-4, -3, -2, -1, 1, 2, 3, 4)
+
+PIXELS = tuple(bytes([value]) for value in range(256))
+
+
+def _code_entry(method: str, palen: int, idx: int) -> tuple[int, int, int]:
+    if not idx & 1:
+        # run of unchanged pixels, one per zero bit
+        zeros = (idx & -idx).bit_length() - 1
+        return OP_SAME, zeros, zeros
+    if not idx & 2:
+        return OP_NEW, 2 + palen, (idx >> 2) & ((1 << palen) - 1)
+    if method == 'basic':
+        return (OP_FLIP if idx & 4 else OP_SUB), 3, 0
+    field = (idx >> 2) & 7
+    if method == 'he':
+        return OP_DELTA, 5, HE_DELTA_COLOR[field]
+    assert method == 'majmin', method
+    if field == 4:
+        return OP_RUN, 5, 0
+    return OP_DELTA, 5, field - 4
+
+
+@cache
+def code_table(method: str, palen: int) -> CodeTable:
+    bits = max(LUT_BITS, 2 + palen)
+    entries = [_code_entry(method, palen, idx) for idx in range(1, 1 << bits)]
+    # all zero bits, longest run covered by the table
+    return [(OP_SAME, bits, bits), *entries], bits
+
+
+def decode_codes(stream, decoded_size, palen, method):
+    """Decode strip from codes of `method` using lookup table of short codes."""
+    table, bits = code_table(method, palen)
+    color = stream.read(1)[0]
+    reader = BitReader(stream.read())
+    peek, skip = reader.peek, reader.skip
+    out = bytearray([color & 0xFF])
+    sub = 1
 
+    while len(out) < decoded_size:
+        op, length, arg = table[peek(bits)]
+        if op == OP_SAME:
+            # stop at the last pixel, zero bits after it are padding
+            count = min(arg, decoded_size - len(out))
+            skip(count)
+            out += PIXELS[color & 0xFF] * count
+            continue
+        skip(length)
+        if op == OP_NEW:
+            color = arg
+            sub = 1
+        elif op == OP_DELTA:
+            color += arg
+        elif op == OP_SUB:
+            color -= sub
+        elif op == OP_FLIP:
+            sub = -sub
+            color -= sub
+        else:
+            out += PIXELS[color & 0xFF] * (reader.read(8) - 1)
+        out.append(color & 0xFF)
 
-def collect_bits(bitstream, count):
-    # TODO: check if special handling needed when count > 8
-    assert count <= 8
-    return int(''.join(str(next(bitstream)) for _ in range(count))[::-1], 2)
+    if reader.overrun:
+        raise ValueError('strip data ended before all pixels were decoded')  # noqa: TRY003
+    return bytes(out)
 
 
 def decode_basic(stream, decoded_size, palen):
-    sub = 1
+    return decode_codes(stream, decoded_size, palen, 'basic')
 
-    with io.BytesIO() as out:
-        color = stream.read(1)[0]
-        bitstream = create_bitsream(stream)
-        out.write(to_byte(color))
 
-        while out.tell() < decoded_size:
-            if next(bitstream):
-                if next(bitstream):
-                    if next(bitstream):
-                        sub = -sub
-                    color -= sub
-                else:
-                    color = collect_bits(bitstream, palen)
-                    sub = 1
-            out.write(to_byte(color))
-        return out.getvalue()
+def decode_run_majmin(stream, decoded_size, palen):
+    return decode_codes(stream, decoded_size, palen, 'majmin')
 
 
-def decode_run_majmin(stream, decoded_size, palen):
-    with io.BytesIO() as out:
-        color = stream.read(1)[0]
-        bitstream = create_bitsream(stream)
-        out.write(to_byte(color))
-
-        while out.tell() < decoded_size:
-            if next(bitstream):
-                if next(bitstream):
-                    shift = collect_bits(bitstream, 3) - 4
-                    if shift != 0:
-                        # print(f'SHIFT {shift}')
-                        color += shift
-                    else:
-                        ln = collect_bits(bitstream, 8) - 1
-                        out.write(to_byte(color) * ln)
-                        # print(f'LARGE GROUP {ln + 1}')
-                else:
-                    color = collect_bits(bitstream, palen)
-                    # print(f'NEW COLOR {color}')
-            # else:
-            #     print('SMALL GROUP')
-            out.write(to_byte(color))
-
-        return out.getvalue()
+def max_encoded_size(size: int) -> int:
+    # longest code is new color of 2 + 8 bits, for each pixel
+    return (size * 10 + 7) // 8
 
 
 def encode_basic(data, palen):
-    bits = []
+    writer = BitWriter(max_encoded_size(len(data)))
+    write = writer.write
     color = data[0]
     sub = 1
     for curr in data[1:]:
         if curr == color:
-            bits.extend([0])
+            write(0b0, 1)
         elif color - curr == sub:
-            # print(f'SHIFT {curr - color}')
-            bits.extend([1, 1, 0])
+            write(0b011, 3)
         elif curr - color == sub:
-            # print(f'SHIFT {curr - color}')
-            bits.extend([1, 1, 1])
+            write(0b111, 3)
             sub = -sub
         else:
-            # print(f'NEW COLOR {curr}')
-            bits.extend([1, 0])
-            bits.extend(int(x) for x in f'{curr:0{palen}b}'[::-1])
+            write(0b01 | curr << 2, 2 + palen)
             sub = 1
         color = curr
 
-    gbits = grouper((str(x) for x in bits), 8, fillvalue='0')
-    return data[:1] + bytes(int(''.join(byte)[::-1], 2) for byte in gbits)
+    return data[:1] + writer.getvalue()
 
 
 def encode_run_majmin(data, palen, limit=255):
-    bits = []
-    grouped = (list(group) for _, group in itertools.groupby(data))
+    writer = BitWriter(max_encoded_size(len(data)))
+    write = writer.write
     color = None
-    for currs in grouped:
-        curr = currs[0]
-        currs = currs[1:]
+    for curr, group in itertools.groupby(data):
         assert curr != color
-        if not bits:
-            bits.extend(int(x) for x in f'{curr:08b}'[::-1])
+        if color is None:
+            write(curr, 8)
         elif -4 <= curr - color < 4:
-            # print(f'SHIFT {curr - color}')
-            bits.extend([1, 1])
-            bits.extend(int(x) for x in f'{curr - color + 4:03b}'[::-1])
+            write(0b11 | (curr - color + 4) << 2, 5)
         else:
-            # print(f'NEW COLOR {curr}')
-            bits.extend([1, 0])
-            bits.extend(int(x) for x in f'{curr:0{palen}b}'[::-1])
+            write(0b01 | curr << 2, 2 + palen)
         color = curr
 
-        if currs:
-            for group in grouper(currs, 255):
-                group = [x for x in group if x is not None]
-                if (
-                    len(group) > limit
-                ):  # 12 in v6+ (dig, samnmax, dott (code 108)), 255 in v5? (atlantis, monkey2 (code 68))
-                    bits.extend([1, 1, 0, 0, 1])
-                    bits.extend(int(x) for x in f'{len(group):08b}'[::-1])
-                    # print(f'LARGE GROUP {len(group)}')
-                else:
-                    # for _ in range(len(group)):
-                    #     print('SMALL GROUP')
-                    bits.extend([0] * len(group))
+        repeats = sum(1 for _ in group) - 1
+        while repeats:
+            count = min(repeats, 255)
+            # 12 in v6+ (dig, samnmax, dott (code 108)), 255 in v5? (atlantis, monkey2 (code 68))
+            if count > limit:
+                write(0b10011 | count << 5, 13)
+            else:
+                write(0, count)
+            repeats -= count
 
-    gbits = grouper((str(x) for x in bits), 8, fillvalue='0')
-    return bytes(int(''.join(byte)[::-1], 2) for byte in gbits)
+    return writer.getvalue()
 
 
 def decode_raw(stream, decoded_size, width):
-    res = stream.read(decoded_size)
-    print(stream.read())
-    return res
+    return stream.read(decoded_size)
 
 
 def unknown_decoder(*args):
@@ -156,43 +257,23 @@ def unknown_decoder(*args):
 
 
 def decode_he(stream, decoded_size, palen):
-    delta_color = [-4, -3, -2, -1, 1, 2, 3, 4]
-
-    with io.BytesIO() as out:
-        color = stream.read(1)[0]
-        bitstream = create_bitsream(stream)
-        out.write(to_byte(color))
-
-        while out.tell() < decoded_size:
-            if next(bitstream):
-                if next(bitstream):
-                    color += delta_color[collect_bits(bitstream, 3)]
-                else:
-                    color = collect_bits(bitstream, palen)
-            out.write(to_byte(color))
-        return out.getvalue()
+    return decode_codes(stream, decoded_size, palen, 'he')
 
 
 def encode_he(data, palen):
-    delta_color = [-4, -3, -2, -1, 1, 2, 3, 4]
-
-    bits = []
+    writer = BitWriter(max_encoded_size(len(data)))
+    write = writer.write
     color = data[0]
     for curr in data[1:]:
         if curr == color:
-            bits.extend([0])
-        elif curr - color in delta_color:
-            # print(f'SHIFT {curr - color}')
-            bits.extend([1, 1])
-            bits.extend(int(x) for x in f'{delta_color.index(curr - color):03b}'[::-1])
+            write(0b0, 1)
+        elif curr - color in HE_DELTA_COLOR:
+            write(0b11 | HE_DELTA_COLOR.index(curr - color) << 2, 5)
         else:
-            # print(f'NEW COLOR {curr}')
-            bits.extend([1, 0])
-            bits.extend(int(x) for x in f'{curr:0{palen}b}'[::-1])
+            write(0b01 | curr << 2, 2 + palen)
         color = curr
 
-    gbits = grouper((str(x) for x in bits), 8, fillvalue='0')
-    return data[:1] + bytes(int(''.join(byte)[::-1], 2) for byte in gbits)
+    return data[:1] + writer.getvalue()
 
 
 def get_method_info(code):
@@ -218,8 +299,14 @@ def get_method_info(code):
         method = decode_he
 
     tr = None
-    if 0x22 <= code <= 0x30 or 0x54 <= code <= 0x80 or code >= 0x8F:
-        # if 34 <= code <= 48 or 84 <= code <= 128 or code >= 143:
+    if (
+        0x22 <= code <= 0x30
+        or 0x54 <= code <= 0x58
+        or 0x7C <= code <= 0x80
+        or code >= 0x8F
+    ):
+        # if 34 <= code <= 48 or 84 <= code <= 88 or 124 <= code <= 128 or 143 <= code:
+        # 104 <= code <= 108 is drawn opaque
         tr = TRANSPARENCY
 
     palen = code % 10
@@ -228,10 +315,14 @@ def get_method_info(code):
     return method, direction, tr, palen
 
 
+def fake_strip_code(data):
+    return RAW_CODE_TR if 0xBB in data else RAW_CODE
+
+
 def fake_encode_strip(data, height, width):
     print(f'==============={0xBB in data}===================')
     with io.BytesIO() as s:
-        s.write(b'\x95' if 0xBB in data else b'\x01')
+        s.write(bytes([fake_strip_code(data)]))
         s.write(bytes(data))
         return s.getvalue()
 
@@ -240,22 +331,74 @@ def encode_raw(data, *args):
     return data
 
 
+def get_encode_method(code):
+    return get_encode_methods(code)[0]
+
+
+def get_encode_methods(code):
+    """Encoders producing data `code` decoder accepts, the usual one first.
+
+    Run code is decoded for every majmin code, so both run limits are valid
+    whatever limit the original encoder of the family used.
+    """
+    method, _, _, palen = get_method_info(code)
+    if method == decode_run_majmin:
+        limits = sorted(RUN_LIMITS, reverse=code - palen in {60, 80})
+        return [partial(encode_run_majmin, limit=limit) for limit in limits]
+    if method == decode_basic:
+        return [encode_basic]
+    if method == decode_he:
+        return [encode_he]
+    assert code in {0x01, 0x95}
+    return [encode_raw]
+
+
+def candidate_codes(code: int, max_bits: int) -> list[int]:
+    """Codes of all methods which can replace `code` for colors of `max_bits`.
+
+    Candidates keep transparency of `code`, HE methods are only
+    included when `code` is already one of them.
+    """
+    method, _, tr, _ = get_method_info(code)
+    he = method == decode_he
+    palen = max(max_bits, MIN_PALEN)
+    candidates = [RAW_CODE_TR if tr is not None else RAW_CODE]
+    candidates += [base + palen for base in CODE_FAMILIES]
+    return [
+        candidate
+        for candidate in candidates
+        if (he or get_method_info(candidate)[0] != decode_he)
+        and get_method_info(candidate)[2] == tr
+    ]
+
+
+def encode_strip_optimal(data, code):
+    """Encode strip with the method which gives the smallest output.
+
+    Palette length only grows the size of new color codes,
+    so the smallest one fitting all colors is used for each method,
+    while every run limit is tried for majmin methods.
+    """
+    max_bits = int(data.max()).bit_length()
+    assert max_bits <= MAX_PALEN, max_bits
+    horizontal, vertical = bytes(data), bytes(data.T)
+    best = None
+    for candidate in candidate_codes(code, max_bits):
+        _, direction, _, palen = get_method_info(candidate)
+        for encode_method in get_encode_methods(candidate):
+            encoded = encode_method(
+                horizontal if direction == 'HORIZONTAL' else vertical,
+                palen,
+            )
+            if best is None or 1 + len(encoded) < len(best):
+                best = bytes([candidate]) + encoded
+    return best
+
+
 def encode_strip(data, height, width, code, allow_upgrade=True):
     method, direction, tr, palen = get_method_info(code)
     data = bytes(data) if direction == 'HORIZONTAL' else bytes(data.T)
-    if method == decode_run_majmin:
-        if code - palen in {60, 80}:
-            encode_method = partial(encode_run_majmin, limit=255)
-        else:
-            assert code - palen in {100, 120}, (code, palen)
-            encode_method = partial(encode_run_majmin, limit=12)
-    elif method == decode_basic:
-        encode_method = encode_basic
-    elif method == decode_he:
-        encode_method = encode_he
-    else:
-        assert code in {0x01, 0x95}
-        encode_method = encode_raw
+    encode_method = get_encode_method(code)
     max_color = max(data)
     max_bits = max_color.bit_length()
     if encode_method != encode_raw:
@@ -281,8 +424,56 @@ def encode_strip(data, height, width, code, allow_upgrade=True):
         return s.getvalue()
 
 
-def parse_strip(height, width, data, transparency=None):
-    print((height, width))
+class Verify(str, Enum):
+    """Re-encoding verification of decoded strips."""
+
+    OFF = 'off'
+    SAMPLED = 'sampled'
+    STRICT = 'strict'
+
+
+class StripVerifyError(ValueError):
+    pass
+
+
+def should_verify(
+    data: bytes,
+    verify: Verify,
+    sample_rate: int = SAMPLE_RATE,
+) -> bool:
+    if verify == Verify.SAMPLED:
+        # stable across runs, the same strips are picked for the same data
+        return zlib.crc32(data) % sample_rate == 0
+    return verify == Verify.STRICT
+
+
+def verify_strip(data: bytes, decoded: bytes, height: int, width: int) -> None:
+    """Check that decoded strip encodes back to its source data."""
+    code = data[0]
+    decode_method, _, _, palen = get_method_info(code)
+    if decode_method not in {decode_run_majmin, decode_basic, decode_he}:
+        return
+
+    encoded, *others = (
+        encode_method(decoded, palen) for encode_method in get_encode_methods(code)
+    )
+    with io.BytesIO(encoded) as stream:
+        if decode_method(stream, width * height, palen) != decoded:
+            raise StripVerifyError(
+                f'Re-encoded strip with code {code} does not decode back',
+            )
+
+    # source data may be padded with a zero byte,
+    # or use another run limit when produced by the optimizing encoder
+    orig = data[1:]
+    if not any(orig in {other, other + b'\x00'} for other in (encoded, *others)):
+        raise StripVerifyError(
+            f'Re-encoded strip with code {code} does not match source: '
+            f'{len(encoded)} bytes, expected {len(orig)}',
+        )
+
+
+def parse_strip(height, width, data, transparency=None, verify=Verify.OFF):
     with io.BytesIO(data) as s:
         code = s.read(1)[0]
 
@@ -292,69 +483,28 @@ def parse_strip(height, width, data, transparency=None):
         if tr is not None:
             tr = transparency
 
-        print(code, decode_method, direction, tr, palen, sep=' === ')
-
-        # try:
-
         decoded = decode_method(s, width * height, palen)  # [:width * height]
 
-        # if decode_method == decode_basic:
-        #     with io.BytesIO(decoded) as dec_stream:
-        #         print(decoded)
-        #         print(data[1:])
-        #         assert encode_basic(dec_stream, height, palen, 8) == data[1:]
-
-        if decode_method in {decode_run_majmin, decode_basic, decode_he}:
-            if decode_method == decode_run_majmin:
-                if code - palen in {60, 80}:
-                    encode_method = partial(encode_run_majmin, limit=255)
-                else:
-                    assert code - palen in {100, 120}, (code, palen)
-                    encode_method = partial(encode_run_majmin, limit=12)
-            elif decode_method == decode_basic:
-                encode_method = encode_basic
-            elif decode_method == decode_he:
-                encode_method = encode_he
-            else:
-                raise ValueError('should not have got here')
-
-            print('=====================')
-            encoded = encode_method(decoded, palen)
-            print('---------------------')
-            with io.BytesIO(encoded) as e:
-                assert decode_method(e, width * height, palen) == decoded
-
-            pos = s.tell()
-            s.seek(1, 0)
-            orig = s.read()
-
-            # s.seek(1, 0)
-            # obits = list(create_bitsream(s))
+        # Verify nothing left in stream
+        assert not s.read()
 
-            # print('O', obits)
+    if should_verify(data, verify):
+        verify_strip(data, decoded, height, width)
 
-            print(pos - 1, len(orig), len(encoded))
-            if orig[: len(encoded)] != encoded:
-                print('ORIG', orig)
-                print('ENCODED', encoded)
-                exit(1)
-            elif len(orig) > len(encoded):
-                assert encoded + b'\x00' == orig
-            s.seek(pos)
+    order = 'C' if direction == 'HORIZONTAL' else 'F'
+    return np.frombuffer(decoded, dtype=np.uint8).reshape(
+        (height, width),
+        order=order,
+    )
 
-        # Verify nothing left in stream
-        assert not s.read()
 
-        order = 'C' if direction == 'HORIZONTAL' else 'F'
-        return np.frombuffer(decoded, dtype=np.uint8).reshape(
-            (height, width),
-            order=order,
-        )
-        # # return np.zeros((height, 8), dtype=np.uint8)
+def split_strips(width: int, data: bytes, strip_width: int = 8) -> list[bytes]:
+    num_strips = width // strip_width
+    with io.BytesIO(data) as s:
+        offs = [(read_uint32le(s) - 8) for _ in range(num_strips)]
 
-        # except Exception as exc:
-        #     logging.exception(exc)
-        #     return np.zeros((height, width), dtype=np.uint8)
+    index = zip(offs, offs[1:] + [len(data)])
+    return [data[offset:end] for offset, end in index]
 
 
 def decode_smap(
@@ -362,22 +512,33 @@ def decode_smap(
     width: int,
     data: bytes,
     transparency: bytes = None,
+    executor: Executor | None = None,
+    verify: Verify = Verify.OFF,
 ) -> Sequence[Sequence[int]]:
+    """Decode strips into image, spread over `executor` when given."""
     strip_width = 8
 
     if width == 0 or height == 0:
         return None
 
-    num_strips = width // strip_width
-    with io.BytesIO(data) as s:
-        offs = [(read_uint32le(s) - 8) for _ in range(num_strips)]
-
-    index = list(zip(offs, offs[1:] + [len(data)]))
-
-    strips = (data[offset:end] for offset, end in index)
-    return np.hstack(
-        [parse_strip(height, strip_width, data, transparency) for data in strips],
+    # copy lazily decrypted data, strips may be sent to worker processes
+    strips = split_strips(width, bytes(data), strip_width)
+    decode = partial(
+        parse_strip,
+        height,
+        strip_width,
+        transparency=transparency,
+        verify=verify,
+    )
+    decoded = (
+        executor.map(decode, strips, chunksize=STRIP_CHUNK_SIZE)
+        if executor is not None
+        else map(decode, strips)
     )
+    out = np.empty((height, strip_width * len(strips)), dtype=np.uint8)
+    for idx, strip in enumerate(decoded):
+        out[:, idx * strip_width : (idx + 1) * strip_width] = strip
+    return out
 
 
 def extract_smap_codes(height: int, width: int, data: bytes) -> Sequence[int]:
@@ -386,21 +547,34 @@ def extract_smap_codes(height: int, width: int, data: bytes) -> Sequence[int]:
     if width == 0 or height == 0:
         return None
 
-    num_strips = width // strip_width
-    with io.BytesIO(data) as s:
-        offs = [(read_uint32le(s) - 8) for _ in range(num_strips)]
+    return [strip[0] for strip in split_strips(width, data)]
 
-    index = list(zip(offs, offs[1:] + [len(data)]))
-    return [data[offset] for offset, _ in index]
 
+def encode_smap(
+    image: Sequence[Sequence[int]],
+    codes=None,
+    optimize: bool = False,
+    executor: Executor | None = None,
+) -> bytes:
+    """Encode image strips with given codes, or as raw strips.
 
-def encode_smap(image: Sequence[Sequence[int]], codes=None) -> bytes:
+    With `optimize`, each strip is encoded with the smallest method
+    which can replace its code, spread over `executor` when given.
+    """
     strip_width = 8
 
     height, width = image.shape
     print(height, width)
     num_strips = width // strip_width
-    if codes:
+    if optimize:
+        parts = np.hsplit(image, num_strips)
+        codes = codes or [fake_strip_code(part) for part in parts]
+        strips = list(
+            executor.map(encode_strip_optimal, parts, codes, chunksize=STRIP_CHUNK_SIZE)
+            if executor is not None
+            else map(encode_strip_optimal, parts, codes)
+        )
+    elif codes:
         print('CODES', codes)
         strips = [
             encode_strip(s, *s.shape, code)
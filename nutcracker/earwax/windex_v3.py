@@ -37,8 +37,8 @@ from nutcracker.sputm.script.shared import BytecodeError, ScriptError, realize_r
 from nutcracker.sputm.windex_v5 import (
     ConditionalJump,
     UnconditionalJump,
+    current_context,
     fstat,
-    l_vars,
     ops,
     print_asts,
     print_locals,
@@ -219,7 +219,7 @@ def decompile_script(elem):
         if elem.tag == 'OC' and coff in entries:
             if coff > min(entries.keys()):
                 yield from print_locals(indent)
-            l_vars.clear()
+            current_context().l_vars.clear()
             yield from print_asts(
                 indent,
                 dict(realize_refs(srefs, hrefs, asts)),
@@ -229,7 +229,7 @@ def decompile_script(elem):
             asts = deque()
             if coff > min(entries.keys()):
                 yield '\t}'
-                l_vars.clear()
+                current_context().l_vars.clear()
             yield ''  # new line
             yield f'\tverb {semantic_key(entries[coff], sem="verb")} {{'
             indent = 2 * '\t'
@@ -247,7 +247,7 @@ def decompile_script(elem):
             ) from exc
         asts.append((off, res))
     yield from print_locals(indent)
-    l_vars.clear()
+    current_context().l_vars.clear()
     yield from print_asts(
         indent,
         dict(realize_refs(srefs, hrefs, asts)),
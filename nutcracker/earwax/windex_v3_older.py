@@ -23,7 +23,7 @@ from nutcracker.sputm.script.shared import BytecodeError, ScriptError, realize_r
 from nutcracker.sputm.windex_v5 import (
     ConditionalJump,
     UnconditionalJump,
-    l_vars,
+    current_context,
     print_asts,
     print_locals,
     semantic_key,
@@ -151,7 +151,7 @@ def decompile_script(elem):
         if elem.tag == 'OC' and coff in entries:
             if coff > min(entries.keys()):
                 yield from print_locals(indent)
-            l_vars.clear()
+            current_context().l_vars.clear()
             yield from print_asts(
                 indent,
                 dict(realize_refs(srefs, hrefs, asts)),
@@ -161,7 +161,7 @@ def decompile_script(elem):
             asts = deque()
             if coff > min(entries.keys()):
                 yield '\t}'
-                l_vars.clear()
+                current_context().l_vars.clear()
             yield ''  # new line
             yield f'\tverb {semantic_key(entries[coff], sem="verb")} {{'
             indent = 2 * '\t'
@@ -179,7 +179,7 @@ def decompile_script(elem):
             ) from exc
         asts.append((off, res))
     yield from print_locals(indent)
-    l_vars.clear()
+    current_context().l_vars.clear()
     yield from print_asts(
         indent,
         dict(realize_refs(srefs, hrefs, asts)),
@@ -0,0 +1,250 @@
+import os
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from dataclasses import replace
+from typing import Any
+
+from nutcracker.kernel2.chunk import ArrayBuffer, Chunk
+from nutcracker.kernel2.element import Element, IndexerSettings, map_chunks
+
+
+class ElementArena:
+    """Flat columnar storage of a mapped element tree.
+
+    Nodes are rows shared by all columns, linked to each other by
+    parent, first child and next sibling indices.
+    Path components and tags are interned, `ArenaElement` views are
+    created on demand when the tree is traversed.
+    """
+
+    __slots__ = (
+        'cfg',
+        'buffer',
+        'extra',
+        'tag_names',
+        '_tag_ids',
+        'tags',
+        'names',
+        'parent',
+        'first_child',
+        'next_sibling',
+        'position',
+        'offset',
+        'size',
+        'gid',
+        'first_root',
+    )
+
+    def __init__(
+        self,
+        cfg: IndexerSettings,
+        buffer: ArrayBuffer,
+        extra: bool = False,
+    ) -> None:
+        self.cfg = cfg
+        # slice views stay valid when the resource file context is closed
+        self.buffer = buffer[:]
+        self.extra = extra
+        self.tag_names: list[str] = []
+        self._tag_ids: dict[str, int] = {}
+        self.tags = array('H')
+        self.names: list[str] = []
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.position = array('q')
+        self.offset = array('q')
+        self.size = array('q')
+        self.gid = array('q')
+        self.first_root = -1
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def append(
+        self,
+        tag: str,
+        parent: int,
+        position: int,
+        offset: int,
+        size: int,
+        gid: int | None = None,
+        name: str = '',
+        prev: int = -1,
+    ) -> int:
+        """Add a node after `prev` sibling, or as first child if there is none."""
+        idx = len(self)
+        tag_id = self._tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = self._tag_ids[tag] = len(self.tag_names)
+            self.tag_names.append(tag)
+        self.tags.append(tag_id)
+        if self.extra:
+            self.names.append(sys.intern(name))
+        self.parent.append(parent)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        self.position.append(position)
+        self.offset.append(offset)
+        self.size.append(size)
+        self.gid.append(-1 if gid is None else gid)
+        if prev >= 0:
+            self.next_sibling[prev] = idx
+        elif parent >= 0:
+            self.first_child[parent] = idx
+        else:
+            self.first_root = idx
+        return idx
+
+    def extend(
+        self,
+        elems: Iterable[Element],
+        parent: int = -1,
+        base: int = 0,
+        dirname: str = '',
+    ) -> None:
+        """Append elements and map their descendants without keeping them."""
+        hsize = self.cfg.header_dtype.itemsize()
+        prev = -1
+        for elem in elems:
+            pos = base + elem.attribs['offset'] + hsize
+            path = elem.attribs.get('path', '')
+            name = path[len(dirname) + 1 :] if dirname else path
+            assert not self.extra or os.path.join(dirname, name) == path, path
+            prev = self.append(
+                elem.tag,
+                parent,
+                pos,
+                elem.attribs['offset'],
+                len(elem.data),
+                elem.attribs.get('gid'),
+                name,
+                prev,
+            )
+            if self.cfg.schema.get(elem.tag):
+                self.extend(
+                    elem._children
+                    if elem._children is not None
+                    else map_chunks(self.cfg, elem.data, parent=elem),
+                    prev,
+                    pos,
+                    path,
+                )
+
+    def iter_siblings(self, idx: int) -> Iterator[int]:
+        while idx >= 0:
+            yield idx
+            idx = self.next_sibling[idx]
+
+    def tag(self, idx: int) -> str:
+        return self.tag_names[self.tags[idx]]
+
+    def path(self, idx: int) -> str:
+        parts = []
+        while idx >= 0:
+            parts.append(self.names[idx])
+            idx = self.parent[idx]
+        return os.path.join(*reversed(parts))
+
+    def data(self, idx: int) -> ArrayBuffer:
+        pos = self.position[idx]
+        return self.buffer[pos : pos + self.size[idx]]
+
+    def chunk(self, idx: int) -> Chunk:
+        pos = self.position[idx]
+        hsize = self.cfg.header_dtype.itemsize()
+        header = self.cfg.header_dtype.from_buffer(self.buffer[pos - hsize : pos])
+        return Chunk(header, self.data(idx))
+
+    def attribs(self, idx: int) -> dict[str, Any]:
+        attribs: dict[str, Any] = {'offset': self.offset[idx], 'size': self.size[idx]}
+        if self.extra:
+            gid = self.gid[idx]
+            attribs['path'] = self.path(idx)
+            attribs['gid'] = gid if gid >= 0 else None
+        return attribs
+
+    def root(self) -> list['ArenaElement']:
+        return [ArenaElement(self, idx) for idx in self.iter_siblings(self.first_root)]
+
+
+class ArenaElement(Element):
+    """Lightweight Element view over a node of `ElementArena`.
+
+    Children views are created on each traversal, unless they were
+    replaced through `update_children` or `add_child`.
+    """
+
+    __slots__ = ('arena', 'idx', '_attribs')
+
+    def __init__(self, arena: ElementArena, idx: int) -> None:  # noqa: PLW0231
+        self.arena = arena
+        self.idx = idx
+        self._attribs: dict[str, Any] | None = None
+        self._children = None
+        self._data = None
+        self._joined = False
+
+    @property  # type: ignore[override]
+    def cfg(self) -> IndexerSettings:
+        return self.arena.cfg
+
+    @property  # type: ignore[override]
+    def chunk(self) -> Chunk:
+        return self.arena.chunk(self.idx)
+
+    @property  # type: ignore[override]
+    def parent(self) -> None:
+        return None
+
+    @property  # type: ignore[override]
+    def attribs(self) -> dict[str, Any]:
+        if self._attribs is None:
+            self._attribs = self.arena.attribs(self.idx)
+        return self._attribs
+
+    @attribs.setter
+    def attribs(self, value: dict[str, Any]) -> None:
+        self._attribs = value
+
+    @property
+    def tag(self) -> str:
+        return self.arena.tag(self.idx)
+
+    @property
+    def data(self) -> ArrayBuffer:
+        if self._data is None and not self._joined:
+            return self.arena.data(self.idx)
+        return Element.data.fget(self)  # type: ignore[attr-defined]
+
+    def children(self) -> Iterator[Element]:
+        if self._children is not None:
+            yield from self._children
+            return
+        if not self.cfg.schema.get(self.tag):
+            return
+        arena = self.arena
+        for idx in arena.iter_siblings(arena.first_child[self.idx]):
+            yield ArenaElement(arena, idx)
+
+    def update_children(self, children: Iterable[Element]) -> None:
+        children = list(children)
+        self._children = children
+        super().update_children(children)
+
+
+def map_arena(
+    cfg: IndexerSettings,
+    buffer: ArrayBuffer,
+    root: Iterable[Element] | None = None,
+) -> ElementArena:
+    """Map whole buffer into an arena without keeping Element objects alive.
+
+    Containers of `root` which were already mapped are reused.
+    """
+    arena = ElementArena(cfg, buffer, extra=cfg.extra is not None)
+    arena.extend(map_chunks(cfg, buffer) if root is None else root)
+    # release state captured by the extra callback once the tree is mapped
+    arena.cfg = replace(cfg, extra=None)
+    return arena
@@ -1,4 +1,5 @@
 import logging
+import struct
 from abc import ABC
 from collections.abc import Iterable, Iterator, Sequence
 from dataclasses import dataclass, replace
@@ -98,6 +99,52 @@ class IFFChunkHeader(ChunkHeader):
         return super().create(data)
 
 
+class StructChunkHeader(ChunkHeader):
+    """ChunkHeader parsed with precompiled `struct.Struct` instead of numpy.
+
+    Subclasses define `struct` with fields in the same order as `dtype`.
+    """
+
+    __slots__ = ()
+    struct: ClassVar[struct.Struct]
+    _tag_index: ClassVar[int]
+    _size_index: ClassVar[int]
+
+    def __init_subclass__(cls, **kwargs: object) -> None:
+        super().__init_subclass__(**kwargs)
+        names = cls.dtype.names
+        cls._tag_index = names.index('tag')
+        cls._size_index = names.index('size')
+
+    @classmethod
+    def itemsize(cls) -> int:
+        return cls.struct.size
+
+    @classmethod
+    def from_buffer(cls, buffer: ArrayBuffer) -> Self:
+        return cls(cls.struct.unpack_from(buffer))  # type: ignore[arg-type]
+
+    def __bytes__(self) -> bytes:
+        return self.struct.pack(*self._header)  # type: ignore[misc]
+
+    @classmethod
+    def create(cls, data: ChunkHeaderData) -> Self:
+        return cls(attrgetter(*cls.dtype.names)(data))
+
+    @property
+    def tag(self) -> bytes:
+        # match numpy fixed-size strings, which drop trailing null bytes
+        return cast(tuple[bytes, ...], self._header)[self._tag_index].rstrip(b'\0')
+
+    @property
+    def size(self) -> int:
+        return cast(tuple[int, ...], self._header)[self._size_index]
+
+
+class IFFStructChunkHeader(IFFChunkHeader, StructChunkHeader):
+    struct = struct.Struct('>4sI')
+
+
 @dataclass(frozen=True)
 class ChunkSettings:
     header_dtype: type[ChunkHeader]
@@ -160,20 +207,28 @@ def nslice(buffer: ArrayBuffer, start: int, end: int) -> ArrayBuffer:
     return res
 
 
+def chunk_end(
+    cfg: ChunkSettings,
+    chunk_header: ChunkHeader,
+    offset: int,
+    buffer_size: int,
+) -> int:
+    """Calculate end of chunk data starting at given offset."""
+    if not chunk_header.size and not chunk_header.tag.rstrip(b'\0'):
+        return buffer_size
+    end = int(offset + chunk_header.size)
+    if cfg.inclheader:
+        end -= cfg.header_dtype.itemsize()
+    return end
+
+
 def untag(
     cfg: ChunkSettings,
     buffer: ArrayBuffer,
     offset: int = 0,
 ) -> tuple[int, Chunk]:
     offset, chunk_header = read_chunk_header(cfg, buffer, offset)
-
-    if set(bytes(chunk_header)) == {0}:
-        end = len(buffer)
-    else:
-        end = int(offset + chunk_header.size)
-
-        if cfg.inclheader:
-            end -= cfg.header_dtype.itemsize()
+    end = chunk_end(cfg, chunk_header, offset, len(buffer))
     chunk_data = nslice(buffer, offset, end)
     return end, Chunk(chunk_header, chunk_data)
 
@@ -195,18 +250,124 @@ def read_chunks(
         offset = noffset + calc_align(noffset, cfg.alignment)
 
 
-def mktag(
+@dataclass(frozen=True, slots=True)
+class ChunkTable:
+    """Columnar layout of sibling chunks.
+
+    `offsets` point at chunk headers and `sizes` count data bytes,
+    `tags` are fixed-width byte strings which can be compared as arrays.
+    """
+
+    offsets: NDArray[np.int64]
+    sizes: NDArray[np.int64]
+    tags: NDArray[np.bytes_]
+    header_size: int
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def data_offsets(self) -> NDArray[np.int64]:
+        return self.offsets + self.header_size
+
+    def select(self, tags: Iterable[str]) -> NDArray[np.intp]:
+        """Indices of chunks with any of given tags."""
+        wanted = np.array([tag.encode('ascii') for tag in tags], dtype=self.tags.dtype)
+        return np.flatnonzero(np.isin(self.tags, wanted))
+
+    def unique_tags(self) -> list[str]:
+        return [tag.decode('ascii') for tag in np.unique(self.tags)]
+
+    def chunks(
+        self,
+        cfg: ChunkSettings,
+        buffer: ArrayBuffer,
+        indices: Iterable[int] | None = None,
+    ) -> Iterator[tuple[int, Chunk]]:
+        """Materialize (offset, Chunk) pairs for given rows, as `read_chunks` does."""
+        if indices is None:
+            indices = range(len(self))
+        offsets, sizes = self.offsets.tolist(), self.sizes.tolist()
+        for idx in indices:
+            offset, size = offsets[idx], sizes[idx]
+            start, chunk_header = read_chunk_header(cfg, buffer, offset)
+            yield offset, Chunk(chunk_header, nslice(buffer, start, start + size))
+
+
+def scan_chunks(
     cfg: ChunkSettings,
-    tag: str,
     buffer: ArrayBuffer,
-) -> Chunk:
-    size = len(buffer)
+    offset: int = 0,
+) -> ChunkTable:
+    """Walk all sibling chunks in buffer without slicing their data.
+
+    The walk only decodes sizes to find offsets of headers, tags and sizes
+    of all collected headers are then decoded at once as a record array.
+    """
+    hsize = cfg.header_dtype.itemsize()
+    dtype = np.dtype(cfg.header_dtype.dtype)  # type: ignore[call-overload]
+    size_dtype, size_pos = dtype.fields['size'][:2]
+    size_slice = slice(size_pos, size_pos + size_dtype.itemsize)
+    size_order = 'big' if size_dtype.str[0] == '>' else 'little'
+    tag_dtype, tag_pos = dtype.fields['tag'][:2]
+    tag_slice = slice(tag_pos, tag_pos + tag_dtype.itemsize)
+    size_fix = hsize if cfg.inclheader else 0
+
+    buffer_size = len(buffer)
+    offsets, headers = [], []
+    while offset < buffer_size:
+        offset = workaround_x80(cfg, buffer, offset)
+        header = bytes(buffer[offset : offset + hsize])
+        if len(header) != hsize:
+            raise ValueError(f'truncated chunk header at offset {offset}')  # noqa: TRY003
+        size = int.from_bytes(header[size_slice], size_order)
+        start = offset + hsize
+        # see `chunk_end`
+        if not size and not header[tag_slice].rstrip(b'\0'):
+            end = buffer_size
+        else:
+            end = start + size - size_fix
+        if not start <= end <= buffer_size:
+            raise ValueError(f'chunk data size mismatch at offset {offset}')  # noqa: TRY003
+        offsets.append(offset)
+        headers.append(header)
+        offset = end + calc_align(end, cfg.alignment)
+
+    table = np.frombuffer(b''.join(headers), dtype=dtype)
+    starts = np.array(offsets, dtype=np.int64) + hsize
+    sizes = table['size'].astype(np.int64) - size_fix
+    # null headers span until the end of buffer
+    null = (table['size'] == 0) & (table['tag'] == b'')
+    sizes[null] = buffer_size - starts[null]
+    return ChunkTable(
+        offsets=starts - hsize,
+        sizes=sizes,
+        tags=table['tag'],
+        header_size=hsize,
+    )
+
+
+def mkheader(cfg: ChunkSettings, tag: str, data_size: int) -> ChunkHeader:
+    size = data_size
     if cfg.inclheader:
         size += cfg.header_dtype.itemsize()
-    header = cfg.header_dtype.create(
+    return cfg.header_dtype.create(
         ChunkHeaderData(tag=tag.encode('ascii'), size=size),
     )
-    return Chunk(header, buffer)
+
+
+def mktag(
+    cfg: ChunkSettings,
+    tag: str,
+    buffer: ArrayBuffer,
+) -> Chunk:
+    return Chunk(mkheader(cfg, tag, len(buffer)), buffer)
+
+
+def chunk_size(cfg: ChunkSettings, data_size: int) -> int:
+    """Size of chunk with given data size when written, including alignment."""
+    size = cfg.header_dtype.itemsize() + data_size
+    return size + calc_align(size, cfg.alignment)
 
 
 def workaround_x80(
@@ -226,9 +387,16 @@ def workaround_x80(
     return offset
 
 
-def write_chunks(cfg: ChunkSettings, chunks: Iterable[Chunk]) -> bytes:
-    stream = bytearray()
+def iter_chunks(cfg: ChunkSettings, chunks: Iterable[Chunk]) -> Iterator[ArrayBuffer]:
+    """Yield header, data and padding of each chunk, data is not copied."""
+    hsize = cfg.header_dtype.itemsize()
     for chunk in chunks:
-        content = bytes(chunk)
-        stream += content + bytes(calc_align(len(content), cfg.alignment))
-    return bytes(stream)
+        yield bytes(chunk.header)
+        yield chunk.data
+        pad = calc_align(hsize + len(chunk.data), cfg.alignment)
+        if pad:
+            yield bytes(pad)
+
+
+def write_chunks(cfg: ChunkSettings, chunks: Iterable[Chunk]) -> bytes:
+    return b''.join(iter_chunks(cfg, chunks))
@@ -1,8 +1,10 @@
 import logging
+import os
 from collections import Counter, defaultdict
-from collections.abc import Callable, Iterable, Iterator
+from collections.abc import Callable, Container, Iterable, Iterator, Sequence
 from contextlib import contextmanager
 from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
 from typing import (
     Any,
 )
@@ -11,17 +13,20 @@ from nutcracker.kernel2.chunk import (
     ArrayBuffer,
     Chunk,
     ChunkSettings,
-    mktag,
+    calc_align,
+    chunk_size,
+    mkheader,
     read_chunks,
-    write_chunks,
+    scan_chunks,
 )
 
 
 class Element:
-    __slots__ = ('cfg', 'chunk', 'attribs', 'parent', '_children', '_data')
+    __slots__ = ('cfg', 'chunk', 'attribs', 'parent', '_children', '_data', '_joined')
 
     _children: list['Element'] | None
     _data: bytes | None
+    _joined: bool
 
     def __init__(
         self,
@@ -36,21 +41,20 @@ class Element:
         self.parent = parent
         self._children = None
         self._data = None
+        self._joined = False
 
     def update_children(self, children: Iterable['Element']) -> None:
         children = list(children)
         # children should have been mapped already to avoid index offset issues
         assert self._children is not None
         self._children = children
-        self.update_raw(
-            write_chunks(
-                self.cfg,
-                (mktag(self.cfg, child.tag, child.data) for child in self.children()),
-            )
-        )
+        # data is joined from children on first access, see `iter_elements`
+        self._data = None
+        self._joined = True
 
     def update_raw(self, value: bytes) -> None:
         self._data = value
+        self._joined = False
 
     def children(self) -> Iterator['Element']:
         schema = self.cfg.schema.get(self.tag)
@@ -64,6 +68,8 @@ class Element:
         if self._children is None:
             self._children = list(self.children())
         self._children.append(child)
+        if self._joined:
+            self._data = None
 
     @property
     def tag(self) -> str:
@@ -71,10 +77,30 @@ class Element:
 
     @property
     def data(self) -> ArrayBuffer:
+        if self._joined:
+            # joined buffer is kept until next update of this element,
+            # children should be updated before reading their parent data
+            if self._data is None:
+                self._data = b''.join(self.iter_data())
+            return memoryview(self._data)
         if self._data is None:
             return self.chunk.data
         return memoryview(self._data)
 
+    @property
+    def data_size(self) -> int:
+        """Size of element data, children data is not joined to calculate it."""
+        if self._joined:
+            return sum(chunk_size(self.cfg, child.data_size) for child in self.children())
+        return len(self.data)
+
+    def iter_data(self) -> Iterator[ArrayBuffer]:
+        """Yield parts of element data without copying unchanged parts."""
+        if self._joined:
+            yield from iter_elements(self.cfg, self.children())
+            return
+        yield self.data
+
     def __repr__(self) -> str:
         attribs = ' '.join(f'{key}={val}' for key, val in self.attribs.items())
         children = ','.join(_format_children(self.children(), max_show=4))
@@ -93,6 +119,21 @@ def _format_children(
         yield f'{tag}*{count}' if count > 1 else tag
 
 
+def iter_elements(
+    cfg: ChunkSettings,
+    elems: Iterable[Element],
+) -> Iterator[ArrayBuffer]:
+    """Yield elements as chunks, in parts suitable for streaming to file."""
+    hsize = cfg.header_dtype.itemsize()
+    for elem in elems:
+        size = elem.data_size
+        yield bytes(mkheader(cfg, elem.tag, size))
+        yield from elem.iter_data()
+        pad = calc_align(hsize + size, cfg.alignment)
+        if pad:
+            yield bytes(pad)
+
+
 class MissingSchemaKeyError(Exception):
     def __init__(self, tag: str) -> None:
         super().__init__(f'Missing key in schema: {tag}')
@@ -122,8 +163,23 @@ def map_chunks(
     *,
     parent: Element | None = None,
     offset: int = 0,
+    tags: Container[str] | None = None,
 ) -> Iterator[Element]:
-    for coffset, chunk in read_chunks(cfg, buffer, offset):
+    """Map sibling chunks in buffer to elements.
+
+    When `tags` is given, only chunks with matching tags are mapped.
+    """
+    chunks: Iterable[tuple[int, Chunk]]
+    if tags is None:
+        chunks = read_chunks(cfg, buffer, offset)
+    else:
+        table = scan_chunks(cfg, buffer, offset)
+        chunks = table.chunks(
+            cfg,
+            buffer,
+            table.select(tag for tag in table.unique_tags() if tag in tags),
+        )
+    for coffset, chunk in chunks:
         elem = Element(
             cfg,
             chunk,
@@ -141,6 +197,69 @@ def map_chunks(
         yield elem
 
 
+class _TagPattern:
+    """Tags which may start an element name matching path segment pattern."""
+
+    __slots__ = ('pattern', 'keep')
+
+    def __init__(self, segment: str, keep: Container[str] = ()) -> None:
+        # element names are tag optionally followed by _suffix
+        self.pattern = segment.split('_', 1)[0]
+        self.keep = keep
+
+    def __contains__(self, tag: object) -> bool:
+        assert isinstance(tag, str)
+        return tag in self.keep or fnmatchcase(tag, self.pattern)
+
+
+def _match_segment(elem: Element, segment: str) -> bool:
+    name = os.path.basename(elem.attribs.get('path', ''))
+    return fnmatchcase(elem.tag, segment) or bool(name and fnmatchcase(name, segment))
+
+
+def select_chunks(
+    cfg: 'IndexerSettings',
+    buffer: ArrayBuffer,
+    select: str | Sequence[str],
+    *,
+    parent: Element | None = None,
+    offset: int = 0,
+    keep: Container[str] = (),
+) -> Iterator[Element]:
+    """Map only elements along paths matching `select` pattern.
+
+    Pattern segments are separated by `/` and matched with `fnmatch`
+    against element tag or name (basename of `path` attribute),
+    e.g. `LECF/LFLF_0042/RMDA/OBCD*`.
+    Chunks are skipped by their header tag before an element is created,
+    containers on the way only hold children which lead to a match.
+    Elements matched by the last segment are mapped lazily as usual.
+    Tags in `keep` are always mapped, for `extra` callbacks relying on them.
+    """
+    segments = select.strip('/').split('/') if isinstance(select, str) else select
+    segment, *rest = segments
+    elems = map_chunks(
+        cfg,
+        buffer,
+        parent=parent,
+        offset=offset,
+        tags=_TagPattern(segment, keep),
+    )
+    for elem in elems:
+        if not _match_segment(elem, segment):
+            continue
+        if not rest:
+            yield elem
+            continue
+        if not cfg.schema.get(elem.tag):
+            continue
+        elem._children = list(
+            select_chunks(cfg, elem.data, rest, parent=elem, keep=keep),
+        )
+        if elem._children:
+            yield elem
+
+
 ExtraFunc = Callable[[Element | None, Chunk, int], dict[str, Any]]
 
 
@@ -156,21 +275,32 @@ def generate_schema(
     buffer: ArrayBuffer,
     parent_tag: str | None = None,
     schema: dict[str, set[str]] | None = None,
+    known: dict[str, set[str]] | None = None,
 ) -> dict[str, set[str]]:
+    """Guess schema by trying to map data of every chunk as container.
+
+    Result is merged into a copy of `known` schema,
+    data leaves of `known` schema are not descended into.
+    """
     if schema is None:
-        schema = defaultdict(set)
+        schema = defaultdict(set, {tag: set(tags) for tag, tags in (known or {}).items()})
+
+    table = scan_chunks(cfg, buffer)
+    tags = table.tags.tolist()
+    data_offsets, sizes = table.data_offsets.tolist(), table.sizes.tolist()
 
-    for _, chunk in read_chunks(cfg, buffer):
-        tag = chunk.tag
+    if parent_tag is not None:
+        schema[parent_tag].update(tag.decode('ascii') for tag in set(tags))
 
-        if parent_tag is not None:
-            schema[parent_tag].add(tag)
+    for idx, raw_tag in enumerate(tags):
+        tag = raw_tag.decode('ascii')
 
         if tag in schema and not schema[tag]:
             continue
 
+        start = data_offsets[idx]
         try:
-            generate_schema(cfg, chunk.data, tag, schema)
+            generate_schema(cfg, buffer[start : start + sizes[idx]], tag, schema)
         except Exception:
             schema[tag] = set()
 
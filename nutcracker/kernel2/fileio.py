@@ -1,25 +1,155 @@
+import functools
+import mmap
+import sys
 import tempfile
 from collections.abc import Iterator
 from contextlib import AbstractContextManager, contextmanager
 from types import TracebackType
-from typing import cast, overload
+from typing import Any, Self, cast, overload
 
 import numpy as np
-from numpy.typing import ArrayLike
+from numpy.typing import ArrayLike, NDArray
+
+XOR_BLOCK_SIZE = 16 * mmap.PAGESIZE
+XOR_CACHE_BLOCKS = 256
+
+# buffer protocol of python classes (PEP 688) is only honored since 3.12,
+# older versions decrypt the whole file to a temporary file instead
+LAZY_XOR = sys.version_info >= (3, 12)
+
+
+class _XorBlocks:
+    __slots__ = ('data', 'key', 'block_size', 'block')
+
+    def __init__(
+        self,
+        data: NDArray[np.uint8],
+        key: int,
+        block_size: int = XOR_BLOCK_SIZE,
+        cache_blocks: int = XOR_CACHE_BLOCKS,
+    ) -> None:
+        self.data = data
+        self.key = key
+        self.block_size = block_size
+        self.block = functools.lru_cache(maxsize=cache_blocks)(self._decrypt)
+
+    def _decrypt(self, idx: int) -> NDArray[np.uint8]:
+        start = idx * self.block_size
+        res = self.data[start : start + self.block_size] ^ np.uint8(self.key)
+        res.flags.writeable = False
+        return res
+
+    def read(self, start: int, end: int) -> memoryview:
+        if end <= start:
+            return memoryview(b'')
+        first, last = start // self.block_size, (end - 1) // self.block_size
+        base = first * self.block_size
+        if first == last:
+            return memoryview(self.block(first))[start - base : end - base]
+        blocks = [self.block(idx) for idx in range(first, last + 1)]
+        return memoryview(np.concatenate(blocks))[start - base : end - base]
+
+
+class XorBuffer:
+    """Read-only view of XOR encrypted data.
+
+    Slicing is zero-copy, bytes are only decrypted when accessed
+    through the buffer protocol, in blocks kept in a LRU cache.
+    """
+
+    __slots__ = ('_blocks', '_view', 'start', 'stop')
+
+    def __init__(self, blocks: _XorBlocks, start: int, stop: int) -> None:
+        self._blocks = blocks
+        self._view: memoryview | None = None
+        self.start = start
+        self.stop = stop
+
+    @classmethod
+    def from_array(cls, data: NDArray[np.uint8], key: int, **kwargs: int) -> Self:
+        return cls(_XorBlocks(data, key, **kwargs), 0, len(data))
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    @property
+    def nbytes(self) -> int:
+        return len(self)
+
+    @overload
+    def __getitem__(self, index: slice) -> 'XorBuffer': ...
+    @overload
+    def __getitem__(self, index: int) -> int: ...
+    def __getitem__(self, index: slice | int) -> 'XorBuffer | int':
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError('only contiguous slices are supported')  # noqa: TRY003
+            return XorBuffer(
+                self._blocks,
+                self.start + start,
+                self.start + max(start, stop),
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('index out of range')  # noqa: TRY003
+        pos = self.start + index
+        return self._blocks.read(pos, pos + 1)[0]
+
+    def __buffer__(self, _flags: int) -> memoryview:
+        # numpy keeps a reference to this object instead of the exported view,
+        # hold on to decrypted bytes so they outlive eviction from the cache
+        if self._view is None:
+            self._view = self._blocks.read(self.start, self.stop)
+        return self._view
+
+    def __bytes__(self) -> bytes:
+        return self.tobytes()
+
+    def __array__(self, dtype: Any = None, copy: bool | None = None) -> NDArray[Any]:
+        return np.frombuffer(self, dtype=np.uint8)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._blocks.read(self.start, self.stop))
+
+    def __eq__(self, other: object) -> bool:
+        try:
+            return self._blocks.read(self.start, self.stop) == memoryview(other)  # type: ignore[arg-type]
+        except TypeError:
+            return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def tobytes(self) -> bytes:
+        return self._blocks.read(self.start, self.stop).tobytes()
+
+    @property
+    def key(self) -> int:
+        return self._blocks.key
+
+    def encrypted(self) -> memoryview:
+        """View of source data as is, without decrypting."""
+        return memoryview(self._blocks.data[self.start : self.stop])
+
+    def __repr__(self) -> str:
+        return f'XorBuffer<0x{self._blocks.key:02X}>[{self.start}:{self.stop}]'
 
 
 class ResourceFile(AbstractContextManager[memoryview]):
     __slots__ = ('buffer', 'closed')
 
-    def __init__(self, buffer: ArrayLike) -> None:
-        self.buffer = memoryview(buffer)  # type: ignore[arg-type]
+    def __init__(self, buffer: ArrayLike | XorBuffer) -> None:
+        self.buffer = (
+            buffer if isinstance(buffer, XorBuffer) else memoryview(buffer)  # type: ignore[arg-type]
+        )
         self.closed = False
 
     def __len__(self) -> int:
         return len(self.buffer)
 
     def __buffer__(self, _flags: int) -> memoryview:
-        return self.buffer
+        return memoryview(self.buffer)  # type: ignore[arg-type]
 
     def __exit__(
         self,
@@ -36,7 +166,7 @@ class ResourceFile(AbstractContextManager[memoryview]):
     def __getitem__(self, index: int) -> int: ...
     def __getitem__(self, index: slice | int) -> ArrayLike | int:
         if not self.closed:
-            return self.buffer[index]
+            return self.buffer[index]  # type: ignore[return-value]
         raise OSError('I/O operation on closed file')  # noqa: TRY003
 
     @classmethod
@@ -48,13 +178,25 @@ class ResourceFile(AbstractContextManager[memoryview]):
             yield cast(memoryview, cls(data))
             return
 
-        with tempfile.TemporaryFile() as tmp:
-            result = np.memmap(tmp, dtype='u1', mode='w+', shape=data.shape)
-            result[:] = data ^ key
-            result.flush()
-            del result
-            with cls(np.memmap(tmp, dtype='u1', mode='r', shape=data.shape)) as f:
-                yield f
+        if not LAZY_XOR:
+            with tempfile.TemporaryFile() as tmp:
+                result = np.memmap(tmp, dtype='u1', mode='w+', shape=data.shape)
+                step = XOR_BLOCK_SIZE * XOR_CACHE_BLOCKS
+                for start in range(0, len(data), step):
+                    np.bitwise_xor(
+                        data[start : start + step],
+                        np.uint8(key),
+                        out=result[start : start + step],
+                    )
+                result.flush()
+                del result
+                with cls(np.memmap(tmp, dtype='u1', mode='r', shape=data.shape)) as f:
+                    yield cast(memoryview, f)
+            return
+
+        # decrypt lazily only the parts which are actually accessed
+        with cls(XorBuffer.from_array(data, key)) as f:
+            yield cast(memoryview, f)
 
     def close(self) -> None:
         self.closed = True
@@ -0,0 +1,424 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager, suppress
+from dataclasses import asdict, dataclass, replace
+from functools import partial
+from typing import IO, Any, Self
+
+import numpy as np
+
+from nutcracker.kernel2.arena import ElementArena, map_arena
+from nutcracker.kernel2.chunk import ArrayBuffer, Chunk
+from nutcracker.kernel2.element import (
+    Element,
+    IndexerSettings,
+    generate_schema,
+    map_chunks,
+)
+
+INDEX_VERSION = 1
+STAMP_SAMPLES = 16
+STAMP_BLOCK_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class FileStamp:
+    """Identify file content by size, mtime and a digest of sampled blocks."""
+
+    size: int
+    mtime: int
+    digest: str
+
+    @classmethod
+    def from_path(cls, path: str | os.PathLike[str]) -> Self:
+        stat = os.stat(path)
+        hasher = hashlib.blake2b(digest_size=16)
+        step = max(stat.st_size // STAMP_SAMPLES, STAMP_BLOCK_SIZE)
+        with open(path, 'rb') as stream:
+            for pos in range(0, stat.st_size, step):
+                stream.seek(pos)
+                hasher.update(stream.read(STAMP_BLOCK_SIZE))
+            stream.seek(max(stat.st_size - STAMP_BLOCK_SIZE, 0))
+            hasher.update(stream.read(STAMP_BLOCK_SIZE))
+        return cls(stat.st_size, stat.st_mtime_ns, hasher.hexdigest())
+
+
+def index_key(cfg: IndexerSettings, *salt: Any) -> str:
+    """Short digest of settings which affect the shape of the mapped tree."""
+    desc = json.dumps(
+        [
+            INDEX_VERSION,
+            cfg.header_dtype.__name__,
+            cfg.alignment,
+            cfg.inclheader,
+            cfg.skip_byte,
+            sorted((tag, sorted(tags)) for tag, tags in cfg.schema.items()),
+            *salt,
+        ],
+        default=str,
+    )
+    return hashlib.blake2b(desc.encode(), digest_size=6).hexdigest()
+
+
+def _encode_stamps(stamps: Sequence[FileStamp]) -> str:
+    return json.dumps([asdict(stamp) for stamp in stamps])
+
+
+def expand(root: Iterable[Element]) -> None:
+    """Map every container in the tree so it can be indexed as a whole."""
+    for elem in root:
+        expand(elem.children())
+
+
+def _flatten(
+    cfg: IndexerSettings,
+    root: Iterable[Element],
+    parent: int = -1,
+    base: int = 0,
+) -> Iterator[tuple[int, int, Element]]:
+    """Pre-order walk yielding (parent index, data position, element)."""
+    hsize = cfg.header_dtype.itemsize()
+    stack = [(parent, base, elem) for elem in reversed(list(root))]
+    idx = 0
+    while stack:
+        parent, base, elem = stack.pop()
+        pos = base + elem.attribs['offset'] + hsize
+        yield parent, pos, elem
+        children = elem._children or ()
+        stack.extend((idx, pos, child) for child in reversed(children))
+        idx += 1
+
+
+def element_columns(
+    cfg: IndexerSettings,
+    root: Iterable[Element],
+    base: int = 0,
+) -> dict[str, Any]:
+    """Flatten mapped tree to index columns, positions relative to `base`."""
+    records = list(_flatten(cfg, root, base=base))
+    elems = [elem for _, _, elem in records]
+    return {
+        'headers': b''.join(bytes(elem.chunk.header) for elem in elems),
+        'extra': bool(elems) and 'path' in elems[0].attribs,
+        'parents': [parent for parent, _, _ in records],
+        'positions': [pos for _, pos, _ in records],
+        'offsets': [elem.attribs['offset'] for elem in elems],
+        'sizes': [len(elem.chunk.data) for elem in elems],
+        'gids': [elem.attribs.get('gid') for elem in elems],
+        'paths': [elem.attribs.get('path', '') for elem in elems],
+    }
+
+
+def elements_from_columns(
+    cfg: IndexerSettings,
+    buffer: ArrayBuffer,
+    columns: dict[str, Any],
+) -> list[Element]:
+    """Rebuild mapped tree over buffer from index columns."""
+    headers, extra = memoryview(columns['headers']), columns['extra']
+    positions, offsets, sizes = columns['positions'], columns['offsets'], columns['sizes']
+    gids, paths = columns['gids'], columns['paths']
+
+    hsize = cfg.header_dtype.itemsize()
+    root: list[Element] = []
+    elems: list[Element] = []
+    for idx, parent in enumerate(columns['parents']):
+        pos, size, gid = positions[idx], sizes[idx], gids[idx]
+        header = cfg.header_dtype.from_buffer(headers[idx * hsize : (idx + 1) * hsize])
+        chunk = Chunk(header, buffer[pos : pos + size])
+        attribs: dict[str, Any] = {'offset': offsets[idx], 'size': size}
+        if extra:
+            attribs['path'] = paths[idx]
+            attribs['gid'] = gid if gid is not None and gid >= 0 else None
+        elem = Element(cfg, chunk, attribs)
+        if cfg.schema.get(elem.tag):
+            elem._children = []
+        if parent < 0:
+            root.append(elem)
+        else:
+            siblings = elems[parent]._children
+            assert siblings is not None
+            siblings.append(elem)
+        elems.append(elem)
+    return root
+
+
+@contextmanager
+def _replace_file(path: str | os.PathLike[str], mode: str) -> Iterator[IO[Any]]:
+    """Write to a unique temporary file next to `path`, then replace it.
+
+    Concurrent writers never share the temporary file,
+    readers see either the previous or the complete new content.
+    """
+    dirname, basename = os.path.split(os.fspath(path))
+    stream = tempfile.NamedTemporaryFile(  # noqa: SIM115
+        mode,
+        dir=dirname or '.',
+        prefix=f'{basename}.',
+        suffix='.tmp',
+        delete=False,
+    )
+    try:
+        with stream:
+            yield stream
+        os.replace(stream.name, path)
+    except BaseException:
+        with suppress(OSError):
+            os.unlink(stream.name)
+        raise
+
+
+def _write_columns(
+    path: str | os.PathLike[str],
+    stamps: Sequence[FileStamp],
+    header_dtype: Any,
+    headers: bytes,
+    extra: bool,
+    parents: Sequence[int],
+    positions: Sequence[int],
+    offsets: Sequence[int],
+    sizes: Sequence[int],
+    gids: Sequence[int | None],
+    paths: Sequence[str],
+) -> None:
+    with _replace_file(path, 'wb') as stream:
+        np.savez(
+            stream,
+            version=np.array(INDEX_VERSION),
+            stamps=np.array(_encode_stamps(stamps)),
+            extra=np.array(extra),
+            headers=np.frombuffer(headers, dtype=header_dtype),
+            parent=np.array(parents, dtype=np.int64),
+            position=np.array(positions, dtype=np.int64),
+            offset=np.array(offsets, dtype=np.int64),
+            size=np.array(sizes, dtype=np.int64),
+            gid=np.array([-1 if gid is None else gid for gid in gids], dtype=np.int64),
+            paths=np.frombuffer('\n'.join(paths).encode(), dtype=np.uint8),
+        )
+
+
+def _read_columns(
+    path: str | os.PathLike[str],
+    stamps: Sequence[FileStamp],
+) -> dict[str, Any] | None:
+    try:
+        with np.load(path) as index:
+            if int(index['version']) != INDEX_VERSION:
+                return None
+            if str(index['stamps']) != _encode_stamps(stamps):
+                return None
+            return {
+                'extra': bool(index['extra']),
+                'headers': index['headers'].tobytes(),
+                'parents': index['parent'].tolist(),
+                'positions': index['position'].tolist(),
+                'offsets': index['offset'].tolist(),
+                'sizes': index['size'].tolist(),
+                'gids': index['gid'].tolist(),
+                'paths': index['paths'].tobytes().decode().split('\n'),
+            }
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_index(
+    cfg: IndexerSettings,
+    path: str | os.PathLike[str],
+    root: Sequence[Element],
+    stamps: Sequence[FileStamp],
+) -> None:
+    """Store the mapped tree layout to a sidecar file.
+
+    Only containers which were already mapped are stored,
+    use `expand` beforehand to store the whole tree.
+    """
+    _write_columns(path, stamps, cfg.header_dtype.dtype, **element_columns(cfg, root))
+
+
+def save_arena(
+    path: str | os.PathLike[str],
+    arena: ElementArena,
+    stamps: Sequence[FileStamp],
+) -> None:
+    """Store arena layout to a sidecar file, same format as `save_index`."""
+    hsize = arena.cfg.header_dtype.itemsize()
+    _write_columns(
+        path,
+        stamps,
+        arena.cfg.header_dtype.dtype,
+        b''.join(bytes(arena.buffer[pos - hsize : pos]) for pos in arena.position),
+        extra=arena.extra,
+        parents=arena.parent,
+        positions=arena.position,
+        offsets=arena.offset,
+        sizes=arena.size,
+        gids=[gid if gid >= 0 else None for gid in arena.gid],
+        paths=[arena.path(idx) if arena.extra else '' for idx in range(len(arena))],
+    )
+
+
+def load_index(
+    cfg: IndexerSettings,
+    buffer: ArrayBuffer,
+    path: str | os.PathLike[str],
+    stamps: Sequence[FileStamp],
+) -> list[Element] | None:
+    """Rebuild mapped tree from sidecar file, None if missing or stale."""
+    columns = _read_columns(path, stamps)
+    if columns is None:
+        return None
+    return elements_from_columns(cfg, buffer, columns)
+
+
+def load_arena(
+    cfg: IndexerSettings,
+    buffer: ArrayBuffer,
+    path: str | os.PathLike[str],
+    stamps: Sequence[FileStamp],
+) -> ElementArena | None:
+    """Rebuild arena from sidecar file, None if missing or stale."""
+    columns = _read_columns(path, stamps)
+    if columns is None:
+        return None
+
+    headers, extra = memoryview(columns['headers']), columns['extra']
+    positions, offsets, sizes = columns['positions'], columns['offsets'], columns['sizes']
+    gids, paths = columns['gids'], columns['paths']
+
+    hsize = cfg.header_dtype.itemsize()
+    arena = ElementArena(replace(cfg, extra=None), buffer, extra=extra)
+    last_child: dict[int, int] = {}
+    for idx, parent in enumerate(columns['parents']):
+        header = cfg.header_dtype.from_buffer(headers[idx * hsize : (idx + 1) * hsize])
+        name = paths[idx]
+        if extra and parent >= 0:
+            name = name[len(paths[parent]) + 1 :]
+        arena.append(
+            header.tag.decode('ascii'),
+            parent,
+            positions[idx],
+            offsets[idx],
+            sizes[idx],
+            gids[idx] if gids[idx] >= 0 else None,
+            name,
+            last_child.get(parent, -1),
+        )
+        last_child[parent] = idx
+    return arena
+
+
+_schema_cache: dict[tuple[str, str], dict[str, set[str]]] = {}
+
+
+def cached_schema(
+    cfg: IndexerSettings,
+    buffer: ArrayBuffer,
+    path: str | os.PathLike[str],
+    stamps: Sequence[FileStamp],
+    known: dict[str, set[str]] | None = None,
+    *,
+    persist: bool = False,
+) -> dict[str, set[str]]:
+    """Generate schema of buffer, memoized by `path` and `stamps`.
+
+    With `persist`, schema is also stored to and loaded from sidecar file
+    at `path`. See `generate_schema` for `known` schema.
+    """
+    key = (os.fspath(path), _encode_stamps(stamps))
+    schema = _schema_cache.get(key)
+    if schema is not None:
+        return schema
+
+    if persist:
+        try:
+            with open(path) as stream:
+                cached = json.load(stream)
+            if cached['version'] == INDEX_VERSION and cached['stamps'] == key[1]:
+                schema = {tag: set(tags) for tag, tags in cached['schema'].items()}
+        except (OSError, ValueError, KeyError):
+            pass
+
+    if schema is None:
+        schema = generate_schema(cfg, buffer, known=known)
+        if persist:
+            content = {
+                'version': INDEX_VERSION,
+                'stamps': key[1],
+                'schema': {tag: sorted(tags) for tag, tags in schema.items()},
+            }
+            try:
+                with _replace_file(path, 'w') as stream:
+                    json.dump(content, stream)
+            except OSError as exc:
+                getattr(cfg, 'logger', logging).warning(
+                    f'could not save schema {path}: {exc}',
+                )
+
+    _schema_cache[key] = schema
+    return schema
+
+
+def load_indexed(
+    cfg: IndexerSettings,
+    buffer: ArrayBuffer,
+    path: str | os.PathLike[str],
+    stamps: Sequence[FileStamp],
+    *,
+    flyweight: bool = False,
+) -> list[Element] | None:
+    """Load mapped tree from sidecar index, None if missing or stale."""
+    if flyweight:
+        arena = load_arena(cfg, buffer, path, stamps)
+        return None if arena is None else list(arena.root())
+    return load_index(cfg, buffer, path, stamps)
+
+
+def store_indexed(
+    cfg: IndexerSettings,
+    buffer: ArrayBuffer,
+    path: str | os.PathLike[str],
+    stamps: Sequence[FileStamp],
+    root: Iterable[Element] | None = None,
+    *,
+    flyweight: bool = False,
+) -> list[Element]:
+    """Map whole tree, reusing containers of `root` which were already mapped,
+    and store it to sidecar index.
+    """
+    save: Callable[[], None]
+    elems: list[Element]
+    if flyweight:
+        arena = map_arena(cfg, buffer, root)
+        save = partial(save_arena, path, arena, stamps)
+        elems = list(arena.root())
+    else:
+        elems = list(map_chunks(cfg, buffer) if root is None else root)
+        expand(elems)
+        save = partial(save_index, cfg, path, elems, stamps)
+    try:
+        save()
+    except OSError as exc:
+        getattr(cfg, 'logger', logging).warning(f'could not save index {path}: {exc}')
+    return elems
+
+
+def map_chunks_indexed(
+    cfg: IndexerSettings,
+    buffer: ArrayBuffer,
+    path: str | os.PathLike[str],
+    stamps: Sequence[FileStamp],
+    *,
+    flyweight: bool = False,
+) -> list[Element]:
+    """Map chunks using sidecar index, (re)building the index when stale.
+
+    With `flyweight`, elements are views over a shared `ElementArena`.
+    """
+    root = load_indexed(cfg, buffer, path, stamps, flyweight=flyweight)
+    if root is not None:
+        return root
+    return store_indexed(cfg, buffer, path, stamps, flyweight=flyweight)
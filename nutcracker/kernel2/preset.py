@@ -4,15 +4,20 @@ from typing import Any, Self
 from nutcracker.kernel2 import tree
 from nutcracker.kernel2.chunk import (
     IFFChunkHeader,
+    iter_chunks,
+    mkheader,
     mktag,
     read_chunks,
+    scan_chunks,
     untag,
     write_chunks,
 )
 from nutcracker.kernel2.element import (
     IndexerSettings,
     generate_schema,
+    iter_elements,
     map_chunks,
+    select_chunks,
 )
 
 
@@ -25,9 +30,14 @@ class _DefaultOverride:
 @dataclass(frozen=True)
 class Preset(IndexerSettings, _DefaultOverride):
     read_chunks = read_chunks
+    scan_chunks = scan_chunks
     write_chunks = write_chunks
+    iter_chunks = iter_chunks
+    iter_elements = iter_elements
     map_chunks = map_chunks
+    select_chunks = select_chunks
     generate_schema = generate_schema
+    mkheader = mkheader
     mktag = mktag
     untag = untag
 
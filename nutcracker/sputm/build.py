@@ -1,57 +1,83 @@
 #!/usr/bin/env python3
 
 import io
+import json
 import os
-from collections.abc import Iterable, Iterator, Sequence
+import shutil
+from collections.abc import Container, Iterable, Iterator, Sequence
+from dataclasses import asdict
+from functools import partial
+from typing import IO, Any
 
-from nutcracker.kernel2.chunk import Chunk
+import numpy as np
+
+from nutcracker.chiper import xor
+from nutcracker.kernel2.chunk import Chunk, chunk_size
 from nutcracker.kernel2.element import Element
 from nutcracker.kernel2.fileio import read_file
+from nutcracker.kernel2.index import FileStamp
 from nutcracker.sputm.tree import GameResource, GameResourceConfig
-from nutcracker.utils.fileio import write_file
+from nutcracker.utils.fileio import write_stream
 
 from .index import (
-    read_directory_leg as read_dir,
-)
-from .index import (
-    read_directory_leg_v8 as read_dir_v8,
-)
-from .index import (
-    read_dlfl,
+    ROOM_OFFSET_DTYPE,
+    UINT16LE,
+    UINT32LE,
+    read_directory_table,
+    read_dlfl_table,
+    write_directory_table,
+    write_dlfl_table,
 )
 from .preset import sputm
 
+MANIFEST_VERSION = 1
+COPY_BLOCK_SIZE = 1 << 20
+
+# children of these chunks are located by their offsets in index directories
+INDEXED_CONTAINERS = frozenset({'LECF', 'LFLF'})
+
 
 def write_dlfl(index) -> bytes:
-    yield len(index).to_bytes(2, byteorder='little', signed=False)
-    yield b''.join(
-        off.to_bytes(4, byteorder='little', signed=False) for off in index.values()
-    )
+    yield write_dlfl_table(np.fromiter(index.values(), dtype=UINT32LE, count=len(index)))
 
 
 def write_dir(index) -> bytes:
-    yield len(index).to_bytes(2, byteorder='little', signed=False)
-    rooms, offsets = zip(*index.values())
-    yield b''.join(room.to_bytes(1, byteorder='little', signed=False) for room in rooms)
-    yield b''.join(off.to_bytes(4, byteorder='little', signed=False) for off in offsets)
+    table = np.fromiter(index.values(), dtype=ROOM_OFFSET_DTYPE, count=len(index))
+    yield write_directory_table(table['room'], table['offset'])
 
 
 def write_dir_v8(index) -> bytes:
-    yield len(index).to_bytes(4, byteorder='little', signed=False)
-    rooms, offsets = zip(*index.values())
-    yield b''.join(room.to_bytes(1, byteorder='little', signed=False) for room in rooms)
-    yield b''.join(off.to_bytes(4, byteorder='little', signed=False) for off in offsets)
+    table = np.fromiter(index.values(), dtype=ROOM_OFFSET_DTYPE, count=len(index))
+    yield write_directory_table(table['room'], table['offset'], UINT32LE)
 
 
 def bind_directory_changes(read, write, orig, mapping) -> bytes:
-    bound = {**dict(read(orig)), **mapping}
-    data = b''.join(write(bound))
+    """Update directory entries, entries after the end of directory are appended."""
+    columns = [np.array(col) for col in read(orig)]
+    size = len(columns[0])
+    values = np.array(list(mapping.values()), dtype=np.int64)
+    values = values.reshape(len(mapping), len(columns))
+    keys = np.fromiter(mapping.keys(), dtype=np.int64, count=len(mapping))
+    inside = keys < size
+    for idx, col in enumerate(columns):
+        col[keys[inside]] = values[inside, idx]
+        columns[idx] = np.concatenate((col, values[~inside, idx].astype(col.dtype)))
+    data = write(*columns)
     return data + orig[len(data) :]
 
 
 def make_index_from_resource(
-    resource: Iterable[Element], ref: Iterable[Element], base_fix: int = 0
+    resource: Iterable[Element],
+    ref: Iterable[Element],
+    base_fix: int = 0,
+    patched: Container[str] | None = None,
 ) -> Iterator[Chunk]:
+    """Update directories of reference index for rooms of resource.
+
+    Offsets of resources are relative to their room, when paths of
+    `patched` rooms are given, only entries of resources in them are
+    updated, other entries are kept from reference.
+    """
     maxs = {}
     diri = {}
     dirr = {}
@@ -104,6 +130,8 @@ def make_index_from_resource(
         for lflf in sputm.findall('LFLF', t):
             diri[lflf.attribs['gid']] = (lflf.attribs['gid'], 0)
             dlfl[lflf.attribs['gid']] = lflf.attribs['offset'] + 16
+            if patched is not None and lflf.attribs['path'] not in patched:
+                continue
             for elem in lflf.children():
                 if elem.tag in resmap and elem.attribs.get('gid'):
                     resmap[elem.tag][elem.attribs['gid']] = (
@@ -115,20 +143,34 @@ def make_index_from_resource(
         for elem in root:
             tag, data = elem.tag, elem.data
 
-            reader, writer = (
-                (read_dir_v8, write_dir_v8) if base_fix == 8 else (read_dir, write_dir)
-            )
+            count_dtype = UINT32LE if base_fix == 8 else UINT16LE
 
             if tag == 'DLFL':
-                data = bind_directory_changes(read_dlfl, write_dlfl, elem.data, dlfl)
+                data = bind_directory_changes(
+                    lambda data: (read_dlfl_table(data),),
+                    write_dlfl_table,
+                    elem.data,
+                    dlfl,
+                )
             if tag in dirmap:
-                data = bind_directory_changes(reader, writer, elem.data, dirmap[tag])
+                data = bind_directory_changes(
+                    partial(read_directory_table, count_dtype=count_dtype),
+                    partial(write_directory_table, count_dtype=count_dtype),
+                    elem.data,
+                    dirmap[tag],
+                )
 
             yield sputm.mktag(tag, data)
 
     return build_index(ref)
 
 
+def read_patched_chunk(full_path: str) -> bytes:
+    """Serialized chunk for patched resource file."""
+    elem = next(sputm.map_chunks(read_file(full_path)))
+    return bytes(sputm.mktag(elem.tag, elem.data))
+
+
 def update_element(
     basedir: str,
     elements: Iterable[Element],
@@ -146,11 +188,140 @@ def update_element(
                 elem.attribs = attribs
             else:
                 elem.update_children(update_element(basedir, elem.children(), files))
-        offset += len(elem.data) + 8
-        elem.attribs['size'] = len(elem.data)
+        offset += elem.data_size + 8
+        elem.attribs['size'] = elem.data_size
         yield elem
 
 
+def _locate_chunk(
+    root: Iterable[Element],
+    path: str,
+) -> tuple[int, Element, int] | None:
+    """Find element by path, with index of its disk and position of its chunk."""
+    hsize = sputm.header_dtype.itemsize()
+    for didx, disk in enumerate(root):
+        elems: Iterable[Element] = [disk]
+        base = 0
+        while True:
+            elem = next(
+                (
+                    elem
+                    for elem in elems
+                    if path == elem.attribs['path']
+                    or path.startswith(elem.attribs['path'] + os.sep)
+                ),
+                None,
+            )
+            if elem is None:
+                break
+            if path == elem.attribs['path']:
+                return didx, elem, base + elem.attribs['offset']
+            base += elem.attribs['offset'] + hsize
+            elems = elem.children()
+    return None
+
+
+def _changed_edits(
+    root: Sequence[Element],
+    edits: dict[str, tuple[int, int, bytes]],
+    prev_patch: dict[str, dict[str, Any]],
+    patch: dict[str, dict[str, Any]],
+) -> dict[str, tuple[int, int, bytes]] | None:
+    """Edits for patch files changed since previous build.
+
+    Resources no longer patched are restored from reference,
+    None is returned when one of them cannot be found.
+    """
+    changed = {}
+    for path in prev_patch.keys() | patch.keys():
+        if prev_patch.get(path) == patch.get(path):
+            continue
+        if path in edits:
+            changed[path] = edits[path]
+            continue
+        found = _locate_chunk(root, path)
+        if found is None:
+            return None
+        didx, elem, pos = found
+        changed[path] = (didx, pos, bytes(sputm.mktag(elem.tag, elem.data)))
+    return changed
+
+
+def patch_in_place(
+    gameres: GameResource,
+    basename: str,
+    root: Sequence[Element],
+    dirname: str,
+    files: Iterable[str],
+    *,
+    incremental: bool = False,
+) -> list[str] | None:
+    """Overwrite patched resources at their offsets in copies of reference files.
+
+    Files which are not resources of the game (e.g. `rpdump.xml`) are ignored.
+    Applies only when every patched resource keeps its tag and size and
+    does not hold resources located through index directories,
+    otherwise the reason is printed, nothing is written and None is returned.
+    Index file is copied as is, as no offset changes.
+    A build manifest is stored next to the output, see `rebuild_resources`.
+    With `incremental`, disk files of previous build with reference layout
+    are reused, only resources whose patch files changed are written again.
+    Returns paths of resources patched in place.
+    """
+    patch = {}
+    edits = {}
+    for path, stamp in patch_stamps(dirname, files).items():
+        found = _locate_chunk(root, path)
+        if found is None:
+            continue
+        patch[path] = stamp
+        didx, elem, pos = found
+        chunk = read_patched_chunk(os.path.join(dirname, path))
+        new = next(sputm.map_chunks(chunk))
+        reason = None
+        if new.tag != elem.tag:
+            reason = f'tag changed from {elem.tag} to {new.tag}'
+        elif len(new.data) != len(elem.data):
+            reason = f'size changed from {len(elem.data)} to {len(new.data)}'
+        elif new.tag in INDEXED_CONTAINERS:
+            reason = f'{new.tag} holds indexed resources'
+        if reason:
+            print(f'cannot patch in place: {path}: {reason}')
+            return None
+        edits[path] = (didx, pos, chunk)
+
+    index_file, *disks = gameres.game.disks
+    key = gameres.game.chiper_key
+
+    manifest_path = f'{basename}.manifest.json'
+    ref = [_stamp(os.path.join(gameres.game.basedir, disk)) for disk in gameres.game.disks]
+    outputs = {
+        f'{basename}{os.path.splitext(disk)[1]}': disk_layout(t)
+        for t, disk in zip(root, disks, strict=True)
+    }
+    prev = _read_manifest(manifest_path) if incremental else None
+    writes = None
+    if prev and prev['ref'] == ref and all(
+        _is_built(prev, path, layout) for path, layout in outputs.items()
+    ):
+        writes = _changed_edits(root, edits, prev['patch'], patch)
+
+    for didx, disk in enumerate([None, *disks], start=-1):
+        src = os.path.join(gameres.game.basedir, disk or index_file)
+        _, ext = os.path.splitext(src)
+        output = f'{basename}{ext}'
+        if writes is None or disk is None:
+            shutil.copyfile(src, output)
+        with open(output, 'r+b') as stream:
+            for edx, pos, chunk in (edits if writes is None else writes).values():
+                if edx == didx:
+                    stream.seek(pos)
+                    xor.write(stream, chunk, key=key)
+
+    _write_manifest(manifest_path, ref, patch, outputs)
+    return sorted(edits)
+
+
 def update_loff(config: GameResourceConfig, disk: Element) -> None:
     """Update LOFF chunk if exists"""
     loff = sputm.find('LOFF', disk)
@@ -168,44 +339,256 @@ def update_loff(config: GameResourceConfig, disk: Element) -> None:
         loff.update_raw(loff_data)
 
 
+def _stamp(path: str | os.PathLike[str]) -> dict[str, Any]:
+    return asdict(FileStamp.from_path(path))
+
+
+def patch_stamps(dirname: str, files: Iterable[str]) -> dict[str, dict[str, Any]]:
+    return {
+        os.path.relpath(path, dirname): _stamp(path)
+        for path in sorted(files)
+        if os.path.isfile(path)
+    }
+
+
+def _read_manifest(path: str) -> dict[str, Any] | None:
+    try:
+        with open(path) as stream:
+            manifest = json.load(stream)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def _write_manifest(
+    path: str,
+    ref: list[dict[str, Any]],
+    patch: dict[str, dict[str, Any]],
+    outputs: dict[str, list[list[Any]]],
+) -> None:
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'ref': ref,
+        'patch': patch,
+        'disks': {
+            output: {'stamp': _stamp(output), 'layout': layout}
+            for output, layout in outputs.items()
+        },
+    }
+    with open(path, 'w') as stream:
+        json.dump(manifest, stream)
+
+
+def _is_built(manifest: dict[str, Any], path: str, layout: list[list[Any]]) -> bool:
+    """Whether disk file from build of `manifest` is unchanged and has `layout`."""
+    built = manifest['disks'].get(path)
+    return bool(
+        built
+        and built['layout'] == layout
+        and os.path.isfile(path)
+        and built['stamp'] == _stamp(path),
+    )
+
+
+def _touches(path: str, changed: Iterable[str]) -> bool:
+    return any(cpath == path or cpath.startswith(path + os.sep) for cpath in changed)
+
+
+def disk_layout(disk: Element) -> list[list[Any]]:
+    """Path, position and data size of each chunk in disk file."""
+    pos = sputm.header_dtype.itemsize()
+    layout = []
+    for elem in disk.children():
+        size = elem.data_size
+        layout.append([elem.attribs.get('path'), pos, size])
+        pos += chunk_size(sputm, size)
+    return layout
+
+
+def _reference_sources(
+    disk: Element,
+    layout: list[list[Any]],
+    reference: list[list[Any]] | None,
+    patch: Iterable[str],
+) -> list[int | None]:
+    """Position in reference disk file of chunks without patch files, else None."""
+    if reference is None or disk.attribs.get('path') in patch:
+        return [None] * len(layout)
+    refmap = {epath: (pos, size) for epath, pos, size in reference}
+    return [
+        refmap[epath][0]
+        if elem.tag != 'LOFF'
+        and refmap.get(epath, (None, None))[1] == size
+        and not _touches(epath, patch)
+        else None
+        for elem, (epath, _, size) in zip(disk.children(), layout, strict=True)
+    ]
+
+
+def _copy_range(src: IO[bytes], dst: IO[bytes], pos: int, size: int) -> None:
+    src.seek(pos)
+    while size:
+        block = src.read(min(size, COPY_BLOCK_SIZE))
+        if not block:
+            raise EOFError(f'reference file ended {size} bytes before chunk end')
+        dst.write(block)
+        size -= len(block)
+
+
+def _write_children(
+    stream: IO[bytes],
+    children: Sequence[Element],
+    sources: Sequence[int | None],
+    ref_stream: IO[bytes],
+    key: int,
+) -> None:
+    """Write chunks at current position of stream.
+
+    Chunks with a reference position are copied from `ref_stream` as is,
+    both files are encoded with the same key.
+    """
+    for elem, src in zip(children, sources, strict=True):
+        if src is None:
+            xor.write_stream(stream, sputm.iter_elements([elem]), key=key)
+        else:
+            _copy_range(ref_stream, stream, src, chunk_size(sputm, elem.data_size))
+
+
+def _update_disk(
+    path: str,
+    disk: Element,
+    layout: list[list[Any]],
+    prev_layout: list[list[Any]],
+    changed: set[str],
+    sources: list[int | None],
+    ref_stream: IO[bytes],
+    key: int,
+) -> None:
+    """Rewrite changed parts of disk file from previous build in place."""
+    children = list(disk.children())
+    tail = next(
+        (
+            idx
+            for idx, (entry, prev) in enumerate(zip(layout, prev_layout, strict=False))
+            if entry != prev
+        ),
+        min(len(layout), len(prev_layout)),
+    )
+    with open(path, 'r+b') as stream:
+        for elem, (epath, pos, _) in zip(children[:tail], layout, strict=False):
+            # same size and position, e.g. LOFF or resources patched in place
+            if elem.tag == 'LOFF' or _touches(epath, changed):
+                stream.seek(pos)
+                xor.write_stream(stream, sputm.iter_elements([elem]), key=key)
+        if tail < len(layout):
+            stream.seek(layout[tail][1])
+            _write_children(stream, children[tail:], sources[tail:], ref_stream, key)
+        stream.truncate(sputm.header_dtype.itemsize() + disk.data_size)
+        stream.seek(0)
+        xor.write(stream, bytes(sputm.mkheader(disk.tag, disk.data_size)), key=key)
+
+
 def rebuild_resources(
     gameres: GameResource,
     basename: str,
     updated_resource: Sequence[Element],
+    *,
+    patch: dict[str, dict[str, Any]] | None = None,
+    incremental: bool = False,
+    reference: Sequence[list[list[Any]]] | None = None,
 ) -> None:
+    """Write game resource files from updated resource tree.
+
+    When stamps of `patch` files are given (see `patch_stamps`), a build
+    manifest is stored next to the output. With `incremental`, disk files
+    of previous build are reused: rooms before the first one which changed
+    position or size are kept (or rewritten in place when patch files
+    under them changed), only the rest of the file is written again.
+
+    With `reference` layout of disk files taken before update (see
+    `disk_layout`), rooms without patch files are copied from reference
+    files as is, and index entries of resources are updated only for
+    patched rooms.
+    """
     index_file, *disks = gameres.game.disks
-    for t, disk in zip(updated_resource, disks, strict=True):
+    key = gameres.game.chiper_key
+
+    manifest_path = f'{basename}.manifest.json'
+    ref = [_stamp(os.path.join(gameres.game.basedir, disk)) for disk in gameres.game.disks]
+    prev = _read_manifest(manifest_path) if incremental and patch is not None else None
+    changed: set[str] = set()
+    if prev and patch is not None and prev['ref'] == ref:
+        prev_patch = prev['patch']
+        changed = {
+            path
+            for path in prev_patch.keys() | patch.keys()
+            if prev_patch.get(path) != patch.get(path)
+        }
+    else:
+        prev = None
+
+    references = reference if patch is not None else None
+    outputs = {}
+    patched: set[str] | None = set() if references is not None else None
+    for didx, (t, disk) in enumerate(zip(updated_resource, disks, strict=True)):
         update_loff(gameres.config, t)
+        # rejoin children to include updated LOFF
+        t.update_children(t.children())
 
         _, ext = os.path.splitext(disk)
-        write_file(
-            f'{basename}{ext}',
-            bytes(
-                sputm.mktag(
-                    t.tag,
-                    memoryview(
-                        sputm.write_chunks(
-                            sputm.mktag(e.tag, e.data) for e in t.children()
-                        )
-                    ),
-                )
-            ),
-            key=gameres.game.chiper_key,
+        path = f'{basename}{ext}'
+        layout = disk_layout(t)
+        sources = _reference_sources(
+            t,
+            layout,
+            references[didx] if references is not None else None,
+            patch or (),
         )
+        if patched is not None:
+            patched |= {
+                epath
+                for (epath, _, _), src in zip(layout, sources, strict=True)
+                if src is None
+            }
+        built = prev and prev['disks'].get(path)
+        with open(os.path.join(gameres.game.basedir, disk), 'rb') as ref_stream:
+            if built and os.path.isfile(path) and built['stamp'] == _stamp(path):
+                _update_disk(
+                    path,
+                    t,
+                    layout,
+                    built['layout'],
+                    changed,
+                    sources,
+                    ref_stream,
+                    key,
+                )
+            else:
+                with open(path, 'wb') as stream:
+                    xor.write(stream, bytes(sputm.mkheader(t.tag, t.data_size)), key=key)
+                    _write_children(stream, list(t.children()), sources, ref_stream, key)
+        outputs[path] = layout
 
     _, ext = os.path.splitext(index_file)
-    write_file(
+    write_stream(
         f'{basename}{ext}',
-        sputm.write_chunks(
+        sputm.iter_chunks(
             make_index_from_resource(
                 updated_resource,
                 gameres.game.index,
                 gameres.config.base_fix,
+                patched,
             ),
         ),
-        key=gameres.game.chiper_key,
+        key=key,
     )
 
+    if patch is None:
+        return
+    _write_manifest(manifest_path, ref, patch, outputs)
+
 
 # ## REFERENCE
 # <MAXS ---- path="MAXS" />
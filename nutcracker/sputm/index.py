@@ -3,10 +3,13 @@
 import io
 import operator
 import pprint
-from collections.abc import Callable, Iterable, Iterator
+from collections.abc import Callable, Iterable, Iterator, Mapping
 from functools import partial
 from itertools import takewhile
-from typing import IO
+from typing import IO, Any
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
 
 from nutcracker.chiper import xor
 from nutcracker.kernel2.chunk import ArrayBuffer
@@ -15,32 +18,123 @@ from nutcracker.kernel2.element import Element
 from .preset import sputm
 
 
+UINT8 = np.dtype('u1')
+UINT16LE = np.dtype('<u2')
+UINT32LE = np.dtype('<u4')
+
+ROOM_OFFSET_DTYPE = np.dtype([('room', UINT8), ('offset', UINT32LE)])
+DOBJ_V8_DTYPE = np.dtype(
+    [('name', 'S40'), ('state', UINT8), ('room', UINT8), ('class', UINT32LE)],
+)
+
+
+def read_planar(
+    data: ArrayBuffer,
+    count_dtype: np.dtype,
+    *dtypes: np.dtype,
+) -> tuple[NDArray[Any], ...]:
+    """Read count prefixed table stored as consecutive columns."""
+    num = int(np.frombuffer(data, dtype=count_dtype, count=1)[0])
+    offset = count_dtype.itemsize
+    columns = []
+    for dtype in dtypes:
+        columns.append(np.frombuffer(data, dtype=dtype, count=num, offset=offset))
+        offset += num * dtype.itemsize
+    return tuple(columns)
+
+
+def write_planar(
+    count_dtype: np.dtype,
+    columns: Iterable[ArrayLike],
+    dtypes: Iterable[np.dtype],
+) -> bytes:
+    arrays = [np.asarray(col, dtype=dtype) for col, dtype in zip(columns, dtypes, strict=True)]
+    return b''.join(
+        (
+            np.array(len(arrays[0]), dtype=count_dtype).tobytes(),
+            *(arr.tobytes() for arr in arrays),
+        ),
+    )
+
+
+def read_records(
+    data: ArrayBuffer,
+    count_dtype: np.dtype,
+    dtype: np.dtype,
+) -> NDArray[Any]:
+    """Read count prefixed table of interleaved records."""
+    num = int(np.frombuffer(data, dtype=count_dtype, count=1)[0])
+    return np.frombuffer(data, dtype=dtype, count=num, offset=count_dtype.itemsize)
+
+
+def write_records(count_dtype: np.dtype, records: NDArray[Any]) -> bytes:
+    return np.array(len(records), dtype=count_dtype).tobytes() + records.tobytes()
+
+
+def read_directory_table(
+    data: ArrayBuffer,
+    count_dtype: np.dtype = UINT16LE,
+) -> tuple[NDArray[np.uint8], NDArray[np.uint32]]:
+    """Room numbers and offsets of resource directory (DIR*, D*)."""
+    rooms, offs = read_planar(data, count_dtype, UINT8, UINT32LE)
+    return rooms, offs
+
+
+def write_directory_table(
+    rooms: ArrayLike,
+    offs: ArrayLike,
+    count_dtype: np.dtype = UINT16LE,
+) -> bytes:
+    return write_planar(count_dtype, (rooms, offs), (UINT8, UINT32LE))
+
+
+def read_dlfl_table(data: ArrayBuffer) -> NDArray[np.uint32]:
+    (offs,) = read_planar(data, UINT16LE, UINT32LE)
+    return offs
+
+
+def write_dlfl_table(offs: ArrayLike) -> bytes:
+    return write_planar(UINT16LE, (offs,), (UINT32LE,))
+
+
+def read_loff_table(data: ArrayBuffer) -> NDArray[Any]:
+    return read_records(data, UINT8, ROOM_OFFSET_DTYPE)
+
+
+def write_loff_table(records: NDArray[Any]) -> bytes:
+    return write_records(UINT8, records.astype(ROOM_OFFSET_DTYPE))
+
+
+class DirectoryView(Mapping[int, tuple[int, ...]]):
+    """Read-only mapping of directory entry index to its fields."""
+
+    __slots__ = ('columns',)
+
+    def __init__(self, *columns: NDArray[Any]) -> None:
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns[0])
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self)))
+
+    def __getitem__(self, idx: int) -> tuple[int, ...]:
+        if not 0 <= idx < len(self):
+            raise KeyError(idx)
+        return tuple(int(col[idx]) for col in self.columns)
+
+    def pairs(self) -> Iterator[tuple[int, tuple[int, ...]]]:
+        """Same as `items`, converting whole columns at once."""
+        return enumerate(zip(*(col.tolist() for col in self.columns), strict=True))
+
+
 def read_directory_leg(data: ArrayBuffer) -> Iterator[tuple[int, tuple[int, int]]]:
-    with io.BytesIO(data) as s:
-        num = int.from_bytes(s.read(2), byteorder='little', signed=False)
-        rnums = [
-            int.from_bytes(s.read(1), byteorder='little', signed=False)
-            for i in range(num)
-        ]
-        offs = [
-            int.from_bytes(s.read(4), byteorder='little', signed=False)
-            for i in range(num)
-        ]
-        return enumerate(zip(rnums, offs, strict=True))
+    return DirectoryView(*read_directory_table(data)).pairs()  # type: ignore[return-value]
 
 
 def read_directory_leg_v8(data: ArrayBuffer) -> Iterator[tuple[int, tuple[int, int]]]:
-    with io.BytesIO(data) as s:
-        num = int.from_bytes(s.read(4), byteorder='little', signed=False)
-        rnums = [
-            int.from_bytes(s.read(1), byteorder='little', signed=False)
-            for i in range(num)
-        ]
-        offs = [
-            int.from_bytes(s.read(4), byteorder='little', signed=False)
-            for i in range(num)
-        ]
-        return enumerate(zip(rnums, offs, strict=True))
+    return DirectoryView(*read_directory_table(data, UINT32LE)).pairs()  # type: ignore[return-value]
 
 
 def read_rnam(data: ArrayBuffer, key: int = 0xFF) -> Iterator[tuple[int, str]]:
@@ -84,71 +178,49 @@ def read_anam(data: ArrayBuffer) -> Iterator[tuple[int, str]]:
 
 
 def read_dobj(data: ArrayBuffer) -> Iterator[tuple[int, tuple[int, int]]]:
-    with io.BytesIO(data) as s:
-        num = int.from_bytes(s.read(2), byteorder='little', signed=False)
-        values = list(s.read(num))
-        # [(state, owner)]
-        return enumerate((val >> 4, val & 0xFF) for val in values)
+    (values,) = read_planar(data, UINT16LE, UINT8)
+    # [(state, owner)]
+    return DirectoryView(values >> 4, values & 0xFF).pairs()  # type: ignore[return-value]
+
+
+def read_dobj_v8_table(data: ArrayBuffer) -> NDArray[Any]:
+    return read_records(data, UINT32LE, DOBJ_V8_DTYPE)
 
 
 def read_dobj_v8(data: ArrayBuffer) -> Iterator[tuple[str, tuple[int, int, int, int]]]:
-    with io.BytesIO(data) as s:
-        num = int.from_bytes(s.read(4), byteorder='little', signed=False)
-        for i in range(num):
-            name = s.read(40).split(b'\0')[0].decode()
-            obj_id = i
-            state = ord(s.read(1))
-            room = ord(s.read(1))
-            obj_class = int.from_bytes(s.read(4), byteorder='little', signed=False)
-            yield name, (obj_id, state, room, obj_class)
+    records = read_dobj_v8_table(data)
+    # bytes fields are stripped from trailing nulls only
+    names = (name.split(b'\0')[0].decode() for name in records['name'].tolist())
+    return zip(
+        names,
+        zip(
+            range(len(records)),
+            records['state'].tolist(),
+            records['room'].tolist(),
+            records['class'].tolist(),
+            strict=True,
+        ),
+        strict=True,
+    )
 
 
 def read_dobj_v7(data: ArrayBuffer) -> Iterator[tuple[int, tuple[int, int, int]]]:
-    with io.BytesIO(data) as s:
-        num = int.from_bytes(s.read(2), byteorder='little', signed=False)
-        states = list(s.read(num))
-        rooms = list(s.read(num))
-        classes = [
-            int.from_bytes(s.read(4), byteorder='little', signed=False)
-            for _ in range(num)
-        ]
-        return enumerate(zip(states, rooms, classes, strict=True))
+    columns = read_planar(data, UINT16LE, UINT8, UINT8, UINT32LE)
+    return DirectoryView(*columns).pairs()  # type: ignore[return-value]
 
 
 def read_dobj_he(data: ArrayBuffer) -> Iterator[tuple[int, tuple[int, int, int, int]]]:
-    with io.BytesIO(data) as s:
-        num = int.from_bytes(s.read(2), byteorder='little', signed=False)
-        states = list(s.read(num))
-        owners = list(s.read(num))
-        rooms = list(s.read(num))
-        classes = [
-            int.from_bytes(s.read(4), byteorder='little', signed=False)
-            for _ in range(num)
-        ]
-        return enumerate(zip(states, owners, rooms, classes, strict=True))
+    columns = read_planar(data, UINT16LE, UINT8, UINT8, UINT8, UINT32LE)
+    return DirectoryView(*columns).pairs()  # type: ignore[return-value]
 
 
 def read_dlfl(data: ArrayBuffer) -> Iterator[tuple[int, int]]:
-    with io.BytesIO(data) as s:
-        num = int.from_bytes(s.read(2), byteorder='little', signed=False)
-        offs = [
-            int.from_bytes(s.read(4), byteorder='little', signed=False)
-            for i in range(num)
-        ]
-        return enumerate(offs)
+    return enumerate(read_dlfl_table(data).tolist())
 
 
 def read_directory(data: ArrayBuffer) -> list[tuple[int, int]]:
-    with io.BytesIO(data) as s:
-        num = int.from_bytes(s.read(1), byteorder='little', signed=False)
-        merged = [
-            (
-                int.from_bytes(s.read(1), byteorder='little', signed=False),
-                int.from_bytes(s.read(4), byteorder='little', signed=False),
-            )
-            for i in range(num)
-        ]
-        return merged
+    records = read_loff_table(data)
+    return list(zip(records['room'].tolist(), records['offset'].tolist(), strict=True))
 
 
 IdGen = Callable[[int, ArrayBuffer, int], int | None]
@@ -180,15 +252,24 @@ def read_uint32le(pid: int, data: ArrayBuffer, off: int) -> int:
 
 
 def compare_pid_off(directory: dict[int, tuple[int, int]], base: int = 0) -> IdGen:
+    # first entry wins when several ids point to same resource
+    lookup: dict[tuple[int, int], int] = {}
+    for gid, (pid, off) in directory.items():
+        lookup.setdefault((pid, off - base), gid)
+
     def inner(pid: int, data: ArrayBuffer, off: int) -> int | None:
-        return next((k for k, v in directory.items() if v == (pid, off + base)), None)
+        return lookup.get((pid, off))
 
     return inner
 
 
 def compare_off_he(directory: dict[int, int]) -> IdGen:
+    lookup: dict[int, int] = {}
+    for gid, off in directory.items():
+        lookup.setdefault(off - 16, gid)
+
     def inner(pid: int, data: ArrayBuffer, off: int) -> int | None:
-        return next((k for k, v in directory.items() if v == off + 16), None)
+        return lookup.get(off)
 
     return inner
 
@@ -1,10 +1,10 @@
-from nutcracker.kernel2.chunk import IFFChunkHeader
+from nutcracker.kernel2.chunk import IFFStructChunkHeader
 from nutcracker.kernel2.preset import Preset
 
 from .schema import SCHEMA
 
 sputm = Preset(
-    header_dtype=IFFChunkHeader,
+    header_dtype=IFFStructChunkHeader,
     alignment=1,
     inclheader=True,
     skip_byte=0x80,
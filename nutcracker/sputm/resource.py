@@ -5,9 +5,11 @@ from dataclasses import asdict, dataclass, field
 
 from nutcracker.kernel2.fileio import ResourceFile
 from nutcracker.kernel2.element import Element
+from nutcracker.kernel2.index import FileStamp, cached_schema, index_key
 
 from .index import read_directory_leg, read_directory_leg_v8
 from .preset import sputm
+from .schema import SCHEMA
 
 version_by_ext_maxs = {
     ('.LA0', 176): (8, 0),
@@ -62,7 +64,13 @@ def get_disk(game: _GameMeta, num: int) -> str:
     return f'DISK{num:02d}.LEC' if num > 0 else '000.LFL'
 
 
-def load_resource(index_file: str | os.PathLike[str], chiper_key: int | None = None) -> Game:
+def load_resource(
+    index_file: str | os.PathLike[str],
+    chiper_key: int | None = None,
+    *,
+    use_index: bool = False,
+) -> Game:
+    """Load game index, with `use_index` its schema is kept in sidecar file."""
     print(index_file)
     basename, ext = os.path.splitext(os.path.basename(index_file))
     ext = ext.upper()
@@ -72,7 +80,14 @@ def load_resource(index_file: str | os.PathLike[str], chiper_key: int | None = N
         chiper_key = chiper_keys.get(ext, 0x00)
 
     with ResourceFile.load(index_file, key=chiper_key) as index:
-        schema = sputm.generate_schema(index)
+        schema = cached_schema(
+            sputm,
+            index,
+            f'{index_file}.{index_key(sputm, chiper_key)}.schema',
+            (FileStamp.from_path(index_file),),
+            known=SCHEMA,
+            persist=use_index,
+        )
         index_root = list(sputm(schema=schema).map_chunks(index))
 
     # Detect version from index
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
 import struct
+from concurrent.futures import Executor
+from dataclasses import dataclass
 
 import numpy as np
 from PIL import Image
@@ -18,11 +20,22 @@ from nutcracker.utils.fileio import write_file
 from ..preset import sputm
 
 
+@dataclass
+class EncodeStats:
+    """Total size of encoded SMAP images and of the images they replace."""
+
+    encoded: int = 0
+    original: int = 0
+
+
 def encode_block_v8(
     filename: str,
     blocktype: str,
     version: int = 8,
     ref: Element | None = None,
+    optimize: bool = False,
+    executor: Executor | None = None,
+    stats: EncodeStats | None = None,
 ) -> bytes:
     im = Image.open(filename)
     npim = np.asarray(im, dtype=np.uint8)
@@ -39,8 +52,11 @@ def encode_block_v8(
             ref_data = bstr.data[8:] if bstr else None
 
         codes = extract_smap_codes(*npim.shape, ref_data) if ref_data else None
-        smap = encode_smap(npim, codes=codes)
+        smap = encode_smap(npim, codes=codes, optimize=optimize, executor=executor)
         assert np.array_equal(npim, decode_smap(*npim.shape, smap))
+        if ref_data and stats is not None:
+            stats.encoded += len(smap)
+            stats.original += len(ref_data)
         # TODO: detect version, older games should return here
         if version < 8:
             return smap
@@ -88,16 +104,36 @@ def encode_block_v8(
 
 if __name__ == '__main__':
     import argparse
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from contextlib import ExitStack
 
     parser = argparse.ArgumentParser(description='read smush file')
     parser.add_argument('filename', help='filename to read from')
     parser.add_argument('-f', '--format', default='SMAP', help='filename to read from')
+    parser.add_argument(
+        '--optimize',
+        action='store_true',
+        help='select smallest compression method for each strip',
+    )
+    parser.add_argument('-j', '--jobs', default=1, type=int, help='worker processes')
     args = parser.parse_args()
 
     im = Image.open(args.filename)
     npim = np.asarray(im, dtype=np.uint8)
 
-    smap = encode_smap(npim)
+    with ExitStack() as stack:
+        executor = (
+            stack.enter_context(
+                ProcessPoolExecutor(
+                    args.jobs,
+                    mp_context=multiprocessing.get_context('fork'),
+                ),
+            )
+            if args.jobs > 1
+            else None
+        )
+        smap = encode_smap(npim, optimize=args.optimize, executor=executor)
     assert np.array_equal(npim, decode_smap(*npim.shape, smap))
 
     write_file('SMAP', sputm.mktag('SMAP', smap))
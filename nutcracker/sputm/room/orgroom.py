@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 
 import io
+import multiprocessing
 import os
 from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import ExitStack
 from dataclasses import dataclass
 
 from nutcracker.kernel2.element import Element
 
 from ..preset import sputm
-from .encode_image import encode_block_v8
+from .encode_image import EncodeStats, encode_block_v8
 from .pproom import get_rooms, read_room_settings
 from .proom import read_imhd, read_imhd_v7, read_imhd_v8
 
@@ -18,7 +21,7 @@ def read_room(header, rmim):
         # 'Game Version < 7'
         for imxx in sputm.findall('IM{:02x}', rmim):
             assert imxx.tag == 'IM00', imxx.tag
-            yield from imxx.children
+            yield from imxx.children()
     else:
         # TODO: check for multiple IMAG in room bg (different image state)
         assert rmim.tag == 'IMAG'
@@ -56,7 +59,7 @@ def read_objects(room, version):
                 yield (
                     path,
                     name,
-                    imxx.children[0],
+                    next(imxx.children()),
                     ObjectHeader(
                         height=obj_height,
                         width=obj_width,
@@ -95,6 +98,9 @@ def encode_images_v8(
     obj_name: str,
     room_id: int,
     rnam: str,
+    optimize: bool = False,
+    executor: Executor | None = None,
+    stats: EncodeStats | None = None,
 ) -> Iterator[tuple[Element, bytes | None]]:
     _, *frames = imag.children()
     for iidx, imxx in enumerate(frames):
@@ -111,7 +117,14 @@ def encode_images_v8(
         print(image)
 
         if os.path.exists(im_path):
-            encoded = encode_block_v8(im_path, imxx.tag, ref=imxx)
+            encoded = encode_block_v8(
+                im_path,
+                imxx.tag,
+                ref=imxx,
+                optimize=optimize,
+                executor=executor,
+                stats=stats,
+            )
             if image.tag == 'SMAP':
                 zpln = sputm.find('ZPLN', image)
                 assert (
@@ -161,6 +174,41 @@ def make_room_images_patch(
     basedir: str,
     rnam: str,
     version: int,
+    optimize: bool = False,
+    workers: int = 1,
+    stats: EncodeStats | None = None,
+) -> Iterator[tuple[str, bytes]]:
+    with ExitStack() as stack:
+        # strips of all images are encoded by the same worker processes
+        executor = (
+            stack.enter_context(
+                ProcessPoolExecutor(
+                    workers,
+                    mp_context=multiprocessing.get_context('fork'),
+                ),
+            )
+            if optimize and workers > 1
+            else None
+        )
+        yield from _make_room_images_patch(
+            root,
+            basedir,
+            rnam,
+            version,
+            optimize,
+            executor,
+            stats,
+        )
+
+
+def _make_room_images_patch(
+    root: Iterable[Element],
+    basedir: str,
+    rnam: str,
+    version: int,
+    optimize: bool,
+    executor: Executor | None,
+    stats: EncodeStats | None,
 ) -> Iterator[tuple[str, bytes]]:
     for t in root:
         for lflf in get_rooms(t.children()):
@@ -188,6 +236,9 @@ def make_room_images_patch(
                         imxx.tag,
                         version=version,
                         ref=imxx,
+                        optimize=optimize,
+                        executor=executor,
+                        stats=stats,
                     )
                     if encoded:
                         if image.tag == 'SMAP':
@@ -221,6 +272,9 @@ def make_room_images_patch(
                             obj_name,
                             room_id,
                             rnam,
+                            optimize=optimize,
+                            executor=executor,
+                            stats=stats,
                         ),
                     )
                     if any(custome is not None for imxx, custome in images):
@@ -266,6 +320,9 @@ def make_room_images_patch(
                             imag.tag,
                             version=version,
                             ref=imag,
+                            optimize=optimize,
+                            executor=executor,
+                            stats=stats,
                         )
                         if encoded:
                             yield (
@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 
 import numpy as np
 from PIL import Image
 
+from nutcracker.codex.smap import Verify
 from nutcracker.graphics import image
 from nutcracker.graphics.frame import resize_pil_image
 from nutcracker.graphics.image import convert_to_pil_image
@@ -45,16 +49,18 @@ def read_room_settings(lflf):
     return header, palette, room, rmim or sputm.find('IMAG', room)
 
 
-def read_room(header, rmim):
+def read_room(header, rmim, executor=None, verify=Verify.OFF):
     if rmim.tag == 'RMIM':
         # 'Game Version < 7'
         for imxx in sputm.findall('IM{:02x}', rmim):
             assert imxx.tag == 'IM00', imxx.tag
             bgim = read_room_background(
-                imxx.children[0],
+                next(imxx.children()),
                 header.width,
                 header.height,
                 header.zbuffers,
+                executor=executor,
+                verify=verify,
             )
             if bgim is None:
                 continue
@@ -83,6 +89,8 @@ def read_room(header, rmim):
                 header.width,
                 header.height,
                 header.zbuffers,
+                executor=executor,
+                verify=verify,
             )
             if bgim is None:
                 continue
@@ -97,62 +105,70 @@ def read_room(header, rmim):
             yield path, im, zpxx
 
 
-def read_objects(header, room, version):
+def read_objects(header, room, version, executor=None, verify=Verify.OFF):
     for obim in sputm.findall('OBIM', room):
-        imhd = sputm.find('IMHD', obim).data
-        if version < 8:
-            print('IMHD', len(imhd), imhd)
-            if version == 7:
-                assert len(imhd) < 80, len(imhd)
-                obj_id, obj_height, obj_width, obj_x, obj_y = read_imhd_v7(imhd)
-            else:
-                obj_id, obj_height, obj_width, obj_x, obj_y = read_imhd(imhd)
+        yield from read_object_images(header, obim, version, executor, verify)
+
+
+def read_object_images(header, obim, version, executor=None, verify=Verify.OFF):
+    imhd = sputm.find('IMHD', obim).data
+    if version < 8:
+        print('IMHD', len(imhd), imhd)
+        if version == 7:
+            assert len(imhd) < 80, len(imhd)
+            obj_id, obj_height, obj_width, obj_x, obj_y = read_imhd_v7(imhd)
+        else:
+            obj_id, obj_height, obj_width, obj_x, obj_y = read_imhd(imhd)
 
-            assert obj_id == obim.attribs['gid'], (obj_id, obim.attribs['gid'])
+        assert obj_id == obim.attribs['gid'], (obj_id, obim.attribs['gid'])
 
-            for imxx in sputm.findall('IM{:02x}', obim):
-                bgim = read_room_background(
-                    imxx.children[0],
+        for imxx in sputm.findall('IM{:02x}', obim):
+            bgim = read_room_background(
+                next(imxx.children()),
+                obj_width,
+                obj_height,
+                0,
+                transparency=header.transparency,
+                executor=executor,
+                verify=verify,
+            )
+            if bgim is None:
+                continue
+            im = convert_to_pil_image(bgim)
+
+            path = imxx.attribs['path']
+            name = f'{obj_id:04d}_{imxx.tag}'
+
+            yield path, name, im, obj_x, obj_y
+    else:
+        assert version == 8, version
+        obj_name, obj_height, obj_width, obj_x, obj_y = read_imhd_v8(imhd)
+        print(obj_name, obj_height, obj_width)
+        for idx, imag in enumerate(sputm.findall('IMAG', obim)):
+            assert idx == 0
+            wrap = sputm.find('WRAP', imag)
+            assert wrap is not None
+            _, *frames = wrap.children()
+            for iidx, bomp in enumerate(frames):
+                chunk = bytes(sputm.mktag(bomp.tag, bomp.data))
+                s = sputm.generate_schema(chunk)
+                image = next(sputm(schema=s).map_chunks(chunk))
+
+                bgim = read_room_background_v8(
+                    image,
                     obj_width,
                     obj_height,
                     0,
                     transparency=header.transparency,
+                    executor=executor,
+                    verify=verify,
                 )
-                if bgim is None:
-                    continue
                 im = convert_to_pil_image(bgim)
 
-                path = imxx.attribs['path']
-                name = f'{obj_id:04d}_{imxx.tag}'
+                path = bomp.attribs['path']
+                name = f'{obj_name}_{iidx:04d}'
 
                 yield path, name, im, obj_x, obj_y
-        else:
-            assert version == 8, version
-            obj_name, obj_height, obj_width, obj_x, obj_y = read_imhd_v8(imhd)
-            print(obj_name, obj_height, obj_width)
-            for idx, imag in enumerate(sputm.findall('IMAG', obim)):
-                assert idx == 0
-                wrap = sputm.find('WRAP', imag)
-                assert wrap is not None
-                _, *frames = wrap.children()
-                for iidx, bomp in enumerate(frames):
-                    chunk = bytes(sputm.mktag(bomp.tag, bomp.data))
-                    s = sputm.generate_schema(chunk)
-                    image = next(sputm(schema=s).map_chunks(chunk))
-
-                    bgim = read_room_background_v8(
-                        image,
-                        obj_width,
-                        obj_height,
-                        0,
-                        transparency=header.transparency,
-                    )
-                    im = convert_to_pil_image(bgim)
-
-                    path = bomp.attribs['path']
-                    name = f'{obj_name}_{iidx:04d}'
-
-                    yield path, name, im, obj_x, obj_y
 
 
 def get_rooms(root):
@@ -185,7 +201,23 @@ EGA = (
 EGA = np.asarray(EGA, dtype=np.uint8)
 
 
-def extract_room_images(root, basedir, rnam, version, ega_mode=False):
+def extract_room_images(root, basedir, rnam, version, ega_mode=False, workers=1):
+    with ExitStack() as stack:
+        # strips of all images are decoded by the same worker processes
+        executor = (
+            stack.enter_context(
+                ProcessPoolExecutor(
+                    workers,
+                    mp_context=multiprocessing.get_context('fork'),
+                ),
+            )
+            if workers > 1
+            else None
+        )
+        _extract_room_images(root, basedir, rnam, version, ega_mode, executor)
+
+
+def _extract_room_images(root, basedir, rnam, version, ega_mode, executor):
     for t in root:
         paths = {}
 
@@ -198,7 +230,7 @@ def extract_room_images(root, basedir, rnam, version, ega_mode=False):
             room_bg = None
             room_id = lflf.attribs.get('gid')
 
-            for path, room_bg, zpxx in read_room(header, rmim):
+            for path, room_bg, zpxx in read_room(header, rmim, executor):
                 if ega_mode and epal:
                     room_bg = np.asarray(room_bg)
                     room_bg1 = egapal[room_bg] % 16
@@ -226,7 +258,12 @@ def extract_room_images(root, basedir, rnam, version, ega_mode=False):
                 paths[path] = True
                 room_bg.save(os.path.join(basedir, 'backgrounds', f'{path}.png'))
 
-            for path, name, im, obj_x, obj_y in read_objects(header, room, version):
+            for path, name, im, obj_x, obj_y in read_objects(
+                header,
+                room,
+                version,
+                executor,
+            ):
                 im.putpalette(palette)
 
                 path = f'{room_id:04d}_{name}' if room_id in rnam else path
@@ -6,18 +6,39 @@ from dataclasses import dataclass
 import numpy as np
 
 from nutcracker.codex.codex import decode1
-from nutcracker.codex.smap import decode_he, decode_smap, read_uint16le, read_uint32le
+from nutcracker.codex.smap import (
+    Verify,
+    decode_he,
+    decode_smap,
+    read_uint16le,
+    read_uint32le,
+)
 
 from ..preset import sputm
 
 
-def read_room_background_v8(image, width, height, zbuffers, transparency=None):
+def read_room_background_v8(
+    image,
+    width,
+    height,
+    zbuffers,
+    transparency=None,
+    executor=None,
+    verify=Verify.OFF,
+):
     if image.tag == 'SMAP':
         sputm.render(image)
         bstr = sputm.findpath('BSTR/WRAP', image)
         if not bstr:
             return None
-        return decode_smap(height, width, bstr.data[8:], transparency=transparency)
+        return decode_smap(
+            height,
+            width,
+            bstr.data[8:],
+            transparency=transparency,
+            executor=executor,
+            verify=verify,
+        )
     elif image.tag == 'BOMP':
         with io.BytesIO(image.data) as s:
             width = read_uint32le(s)
@@ -28,9 +49,24 @@ def read_room_background_v8(image, width, height, zbuffers, transparency=None):
         raise ValueError(f'Unknown image codec: {image.tag}')
 
 
-def read_room_background(image, width, height, zbuffers, transparency=None):
+def read_room_background(
+    image,
+    width,
+    height,
+    zbuffers,
+    transparency=None,
+    executor=None,
+    verify=Verify.OFF,
+):
     if image.tag == 'SMAP':
-        return decode_smap(height, width, image.data, transparency)
+        return decode_smap(
+            height,
+            width,
+            image.data,
+            transparency,
+            executor=executor,
+            verify=verify,
+        )
     elif image.tag == 'BOMP':
         with io.BytesIO(image.data) as s:
             # pylint: disable=unused-variable
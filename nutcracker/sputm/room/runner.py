@@ -1,11 +1,23 @@
 import os
+from functools import partial
 from pathlib import Path
 
 import typer
 
+from nutcracker.codex.smap import Verify
+from nutcracker.sputm.room.encode_image import EncodeStats
 from nutcracker.sputm.room.orgroom import make_room_images_patch
-from nutcracker.sputm.room.pproom import extract_room_images
+from nutcracker.sputm.room.pproom import (
+    extract_room_images,
+    get_rooms,
+    read_object_images,
+    read_room,
+    read_room_settings,
+)
 from nutcracker.utils.fileio import write_file
+from nutcracker.utils.libio import suppress_stdout
+
+from ..preset import sputm
 
 from ..tree import open_game_resource
 
@@ -16,6 +28,7 @@ app = typer.Typer()
 def decode(
     filename: Path = typer.Argument(..., help='Game resource index file'),
     ega_mode: bool = typer.Option(False, '--ega', help='Simulate EGA images decoding'),
+    jobs: int = typer.Option(1, '--jobs', '-j', help='Worker processes'),
 ) -> None:
     gameres = open_game_resource(filename)
     basename = gameres.basename
@@ -36,13 +49,19 @@ def decode(
     os.makedirs(os.path.join(basedir, 'objects'), exist_ok=True)
     os.makedirs(os.path.join(basedir, 'objects_layers'), exist_ok=True)
 
-    extract_room_images(root, basedir, rnam, version, ega_mode=ega_mode)
+    extract_room_images(root, basedir, rnam, version, ega_mode=ega_mode, workers=jobs)
 
 
 @app.command('encode')
 def encode(
     dirname: Path = typer.Argument(..., help='Patch directory'),
     ref: Path = typer.Option(..., '--ref', help='Reference resource index'),
+    optimize: bool = typer.Option(
+        False,
+        '--optimize',
+        help='Select smallest compression method for each strip',
+    ),
+    jobs: int = typer.Option(1, '--jobs', '-j', help='Worker processes'),
 ) -> None:
     gameres = open_game_resource(ref)
     basename = os.path.basename(os.path.normpath(dirname))
@@ -55,15 +74,60 @@ def encode(
         # )
     )
 
+    stats = EncodeStats()
     for path, content in make_room_images_patch(
         root,
         os.path.join(basename, 'IMAGES'),
         gameres.rooms,
         gameres.game.version,
+        optimize=optimize,
+        workers=jobs,
+        stats=stats,
     ):
         res_path = os.path.join(dirname, path)
         os.makedirs(os.path.dirname(res_path), exist_ok=True)
         write_file(res_path, content)
+    if stats.original:
+        print(f'SMAP: {stats.encoded} bytes, original {stats.original} bytes')
+
+
+@app.command('verify')
+def verify(
+    filename: Path = typer.Argument(..., help='Game resource index file'),
+    mode: Verify = typer.Option(
+        Verify.STRICT,
+        '--mode',
+        help='Verify every strip or only a stable sample of them',
+    ),
+) -> None:
+    gameres = open_game_resource(filename)
+    root = gameres.read_resources()
+    version = gameres.game.version
+
+    total = failed = 0
+    for disk in root:
+        for lflf in get_rooms(disk.children()):
+            header, _, room, rmim = read_room_settings(lflf)
+            images = [
+                (rmim, partial(read_room, header, rmim)),
+                *(
+                    (obim, partial(read_object_images, header, obim, version))
+                    for obim in sputm.findall('OBIM', room)
+                ),
+            ]
+            for elem, read_images in images:
+                total += 1
+                try:
+                    with suppress_stdout():
+                        for _ in read_images(verify=mode):
+                            pass
+                except (ValueError, AssertionError) as exc:
+                    # strips which cannot be parsed fail on decoder assertions
+                    failed += 1
+                    print(elem.attribs['path'], exc)
+    print(f'verified {total} images, {failed} failed')
+    if failed:
+        raise typer.Exit(1)
 
 
 if __name__ == '__main__':
@@ -4,10 +4,17 @@ from pathlib import Path
 
 import typer
 
-from nutcracker.sputm.build import rebuild_resources, update_element
+from nutcracker.sputm.build import (
+    disk_layout,
+    patch_in_place,
+    patch_stamps,
+    rebuild_resources,
+    update_element,
+)
 from nutcracker.sputm.char.decode import decode_all_fonts, get_chars
 from nutcracker.sputm.char.encode import encode_char
 from nutcracker.sputm.schema import SCHEMA
+from nutcracker.sputm.script.bytecode import Verify
 from nutcracker.sputm.strings import (
     RAW_ENCODING,
     get_all_scripts,
@@ -34,33 +41,89 @@ app.add_typer(script_windex.app, name='script')
 @app.command()
 def extract(
     filename: Path = typer.Argument(..., help='Game resource index file'),
+    jobs: int = typer.Option(1, '--jobs', '-j', help='Worker processes'),
+    select: str = typer.Option(
+        None,
+        '--select',
+        '-s',
+        help='Extract only resources matching path pattern, e.g. LECF/LFLF_0042',
+    ),
+    index: bool = typer.Option(
+        False,
+        '--index',
+        help='Reuse chunk index stored next to game resource files',
+    ),
 ) -> None:
-    gameres = open_game_resource(filename)
+    gameres = open_game_resource(filename, use_index=index)
     basename = gameres.basename
     print(f'Extracting game resources: {basename}')
-    dump_resources(gameres, basename)
+    dump_resources(gameres, basename, workers=jobs, select=select, use_index=index)
 
 
 @app.command()
 def build(
     dirname: Path = typer.Argument(..., help='Patch directory'),
     ref: Path = typer.Option(..., '--ref', help='Reference resource index'),
+    jobs: int = typer.Option(1, '--jobs', '-j', help='Worker processes'),
+    incremental: bool = typer.Option(
+        False,
+        '--incremental',
+        '-i',
+        help='Only rewrite parts changed since previous build',
+    ),
+    in_place: bool = typer.Option(
+        False,
+        '--in-place',
+        help='Overwrite resources in copies of reference files when sizes are kept',
+    ),
+    index: bool = typer.Option(
+        False,
+        '--index',
+        help='Reuse chunk index stored next to game resource files',
+    ),
 ) -> None:
-    gameres = open_game_resource(ref)
+    gameres = open_game_resource(ref, use_index=index)
     basename = os.path.basename(os.path.normpath(dirname))
     print(f'Rebuilding game resources: {basename}')
 
     files = set(glob.iglob(f'{dirname}/**/*', recursive=True))
     assert None not in files
 
-    root = gameres.read_resources(
-        # schema=narrow_schema(
-        #     SCHEMA, {'LECF', 'LFLF', 'ROOM', 'RMIM'}
-        # )
+    root = list(
+        gameres.read_resources(
+            # schema=narrow_schema(
+            #     SCHEMA, {'LECF', 'LFLF', 'ROOM', 'RMIM'}
+            # )
+            workers=jobs,
+            use_index=index,
+        ),
     )
 
+    if in_place:
+        patched = patch_in_place(
+            gameres,
+            basename,
+            root,
+            str(dirname),
+            files,
+            incremental=incremental,
+        )
+        if patched is not None:
+            for path in patched:
+                print(f'patched in place: {path}')
+            return
+
+    # offsets of elements are updated along with the tree
+    reference = [disk_layout(disk) for disk in root]
     updated_resource = list(update_element(dirname, root, files))
-    rebuild_resources(gameres, basename, updated_resource)
+    rebuild_resources(
+        gameres,
+        basename,
+        updated_resource,
+        patch=patch_stamps(str(dirname), files),
+        incremental=incremental,
+        reference=reference,
+    )
 
 
 # ## STRINGS
@@ -75,6 +138,11 @@ def extract_strings(
         '-t',
         help='save strings to file',
     ),
+    verify: Verify = typer.Option(
+        Verify.OFF,
+        '--verify',
+        help='Round-trip verification of parsed scripts',
+    ),
 ) -> None:
     gameres = open_game_resource(filename)
     basename = os.path.basename(os.path.normpath(filename))
@@ -93,7 +161,7 @@ def extract_strings(
     var_size = 4 if gameres.game.version >= 8 else 2
 
     with open(textfile, 'w', **RAW_ENCODING) as f:
-        for msg in get_all_scripts(root, script_ops, script_map):
+        for msg in get_all_scripts(root, script_ops, script_map, verify):
             print(msg_to_print(msg, var_size=var_size), file=f)
 
 
@@ -106,6 +174,11 @@ def inject_strings(
         '-t',
         help='save strings to file',
     ),
+    verify: Verify = typer.Option(
+        Verify.FULL,
+        '--verify',
+        help='Round-trip verification of parsed scripts',
+    ),
 ) -> None:
     gameres = open_game_resource(filename)
     basename = gameres.basename
@@ -124,7 +197,13 @@ def inject_strings(
     with open(textfile, 'r', **RAW_ENCODING) as f:
         fixed_lines = (print_to_msg(line) for line in f)
         updated_resource = list(
-            update_element_strings(root, fixed_lines, script_ops, script_map),
+            update_element_strings(
+                root,
+                fixed_lines,
+                script_ops,
+                script_map,
+                verify,
+            ),
         )
 
     rebuild_resources(gameres, basename, updated_resource)
@@ -157,6 +236,7 @@ def extract_fonts(
 def inject_fonts(
     dirname: Path = typer.Argument(..., help='Patch directory'),
     ref: Path = typer.Option(..., '--ref', help='Reference resource index'),
+    jobs: int = typer.Option(1, '--jobs', '-j', help='Worker processes'),
 ) -> None:
     gameres = open_game_resource(ref)
     basename = os.path.basename(os.path.normpath(dirname))
@@ -164,6 +244,7 @@ def inject_fonts(
 
     root = gameres.read_resources(
         schema=narrow_schema(SCHEMA, {'LECF', 'LFLF', 'CHAR'}),
+        workers=jobs,
     )
 
     base = os.path.join(dirname, 'chars')
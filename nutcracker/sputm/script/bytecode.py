@@ -1,5 +1,10 @@
+import bisect
 import io
+import itertools
+import zlib
 from collections.abc import Iterable, Iterator, Mapping
+from contextlib import ExitStack
+from enum import Enum
 from typing import TypeVar
 
 from nutcracker.kernel2.element import Element
@@ -7,11 +12,22 @@ from nutcracker.sputm.script.opcodes import OpTable
 from nutcracker.sputm.script.opcodes_v5 import SomeOp
 from nutcracker.utils.funcutils import flatten
 
+from .decoder import CompiledOpTable, get_compiled
 from .parser import CString, RefOffset, ScriptArg, Statement
 
 S_Arg = TypeVar('S_Arg', bound=ScriptArg)
 ByteCode = Mapping[int, Statement]
 
+SAMPLE_RATE = 16
+
+
+class Verify(str, Enum):
+    """Round-trip verification of parsed bytecode."""
+
+    OFF = 'off'
+    SAMPLED = 'sampled'
+    FULL = 'full'
+
 
 def get_argtype(args: Iterable[ScriptArg], argtype: type[S_Arg]) -> Iterable[S_Arg]:
     for arg in args:
@@ -41,21 +57,75 @@ class BytecodeParseError(ValueError):
         self.base_offset = base_offset
 
 
+class BytecodeVerifyError(ValueError):
+    pass
+
+
+def should_verify(
+    data: bytes,
+    verify: Verify,
+    sample_rate: int = SAMPLE_RATE,
+) -> bool:
+    if verify == Verify.SAMPLED:
+        # stable across runs, the same scripts are picked for the same data
+        return zlib.crc32(data) % sample_rate == 0
+    return verify == Verify.FULL
+
+
+def verify_bytecode(bytecode: ByteCode, data: bytes) -> None:
+    """Check references and that bytecode serializes back to source data."""
+    for _off, stat in bytecode.items():
+        for arg in get_argtype(stat.args, RefOffset):
+            if arg.abs not in bytecode:
+                raise BytecodeVerifyError(
+                    f'Reference to unknown offset 0x{arg.abs:04x} at 0x{stat.offset:04x}',
+                )
+    if to_bytes(bytecode) != data:
+        raise BytecodeVerifyError('Serialized bytecode does not match source')
+    if to_bytes(refresh_offsets(bytecode)) != data:
+        raise BytecodeVerifyError('Bytecode with refreshed offsets does not match source')
+
+
 def descumm_iter(
     data: bytes,
     opcodes: OpTable,
     base_offset: int = 0,
+    verify: Verify = Verify.OFF,
+    compiled: CompiledOpTable | None = None,
 ) -> Iterable[tuple[int, Statement]]:
-    with io.BytesIO(data) as stream:
-        bytecode = {}
-        while True:
-            offset = stream.tell()
-            next_byte = stream.read(1)
-            if not next_byte:
-                break
-            opcode = ord(next_byte)
+    if compiled is None:
+        compiled = get_compiled(opcodes)
+    fixed, decoders = compiled.fixed, compiled.decoders
+    buffer = bytes(data)
+    size = len(buffer)
+    # ops without a known argument layout are parsed from stream
+    stream = None
+    bytecode = {}
+    offset = 0
+    with ExitStack() as stack:
+        while offset < size:
+            opcode = buffer[offset]
             try:
-                op = opcodes[opcode](opcode, stream)  # type: ignore
+                op = None
+                entry = fixed.get(opcode)
+                if entry is not None:
+                    name, arg_size, value_type = entry
+                    end = offset + 1 + arg_size
+                    if end <= size:
+                        args = (
+                            (value_type.from_op(buffer[offset + 1 : end]),)
+                            if value_type
+                            else ()
+                        )
+                        op = Statement.from_args(name, opcode, offset, args)
+                elif (decode := decoders.get(opcode)) is not None:
+                    op, end = decode(opcode, buffer, offset)
+                if op is None:
+                    if stream is None:
+                        stream = stack.enter_context(io.BytesIO(buffer))
+                    stream.seek(offset + 1)
+                    op = opcodes[opcode](opcode, stream)  # type: ignore
+                    end = stream.tell()
                 bytecode[op.offset] = op
                 # print(f'0x{op.offset:04x}', op)
 
@@ -73,20 +143,14 @@ def descumm_iter(
 
             else:
                 yield op.offset, bytecode[op.offset]
+            offset = end
 
-        for _off, stat in bytecode.items():
-            for arg in get_argtype(stat.args, RefOffset):
-                assert arg.abs in bytecode, hex(arg.abs)
+        if should_verify(data, verify):
+            verify_bytecode(bytecode, data)
 
-        assert to_bytes(bytecode) == data
-        assert to_bytes(refresh_offsets(bytecode)) == data, (
-            to_bytes(refresh_offsets(bytecode)),
-            data,
-        )
 
-
-def descumm(data: bytes, opcodes: OpTable) -> ByteCode:
-    return dict(descumm_iter(data, opcodes))
+def descumm(data: bytes, opcodes: OpTable, verify: Verify = Verify.OFF) -> ByteCode:
+    return dict(descumm_iter(data, opcodes, verify=verify))
 
 
 def print_bytecode(bytecode: ByteCode) -> None:
@@ -101,10 +165,85 @@ def get_strings(bytecode: ByteCode) -> Iterable[CString]:
                 yield arg
 
 
+def replace_strings(bytecode: ByteCode, strings: Iterable[bytes]) -> dict[int, int]:
+    """Replace messages in order, returns size delta of changed statements by offset."""
+    deltas: dict[int, int] = {}
+    strings = iter(strings)
+    for off, stat in bytecode.items():
+        for arg in get_argtype(stat.args, CString):
+            if not arg.msg:
+                continue
+            upd = next(strings, None)
+            if upd is None:
+                return deltas
+            if upd != arg.msg:
+                deltas[off] = deltas.get(off, 0) + len(upd) - len(arg.msg)
+                arg.msg = upd
+    return deltas
+
+
 def update_strings(bytecode: ByteCode, strings: Iterable[bytes]) -> ByteCode:
-    for orig, upd in zip(get_strings(bytecode), strings):
-        orig.msg = upd
-    return refresh_offsets(bytecode)
+    return relocate_offsets(bytecode, replace_strings(bytecode, strings))
+
+
+def update_script_strings(
+    data: bytes,
+    bytecode: ByteCode,
+    strings: Iterable[bytes],
+) -> tuple[ByteCode, bytes]:
+    """Replace messages of bytecode parsed from data and serialize it back.
+
+    Only statements with changed messages or jumps across them
+    are serialized again, the rest is copied from data.
+    """
+    deltas = replace_strings(bytecode, strings)
+    if not deltas:
+        return bytecode, data
+    offsets = [*bytecode, len(data)]
+    updated, dirty = _relocate(bytecode, deltas)
+    with io.BytesIO() as stream:
+        for start, end, stat in zip(offsets, offsets[1:], bytecode.values()):
+            stream.write(stat.to_bytes() if start in dirty else data[start:end])
+        return updated, stream.getvalue()
+
+
+def _relocate(
+    bytecode: ByteCode,
+    deltas: Mapping[int, int],
+) -> tuple[ByteCode, set[int]]:
+    # offsets of statements which changed in size, with prefix sum of the deltas
+    changed = sorted(off for off, delta in deltas.items() if delta)
+    shifts = list(itertools.accumulate(deltas[off] for off in changed))
+
+    def shift(off: int) -> int:
+        idx = bisect.bisect_left(changed, off)
+        return shifts[idx - 1] if idx else 0
+
+    dirty = set(deltas)
+    if not changed:
+        return bytecode, dirty
+    first = changed[0]
+    updated = {}
+    for off, stat in bytecode.items():
+        moved = shift(off) if off > first else 0
+        for arg in get_argtype(stat.args, RefOffset):
+            target = shift(arg.abs)
+            if target != moved:
+                dirty.add(off)
+            arg.endpos += moved
+            arg.abs += target
+        stat.offset = off + moved
+        updated[stat.offset] = stat
+    return updated, dirty
+
+
+def relocate_offsets(bytecode: ByteCode, deltas: Mapping[int, int]) -> ByteCode:
+    """Shift statements and references by size delta of changed statements.
+
+    Unlike `refresh_offsets`, does not serialize statements,
+    `deltas` maps offsets of changed statements to their size delta.
+    """
+    return _relocate(bytecode, deltas)[0]
 
 
 def refresh_offsets(bytecode: ByteCode) -> ByteCode:
@@ -0,0 +1,151 @@
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from functools import partial
+from typing import NamedTuple
+
+from .opcodes import (
+    ARG_BYTE,
+    ARG_DWORD,
+    ARG_LAYOUTS,
+    ARG_WORD,
+    ArgLayout,
+    ArgSpec,
+    OpTable,
+)
+from .parser import (
+    ByteValue,
+    CString,
+    DWordValue,
+    RefOffset,
+    ScriptArg,
+    Statement,
+    WordValue,
+)
+
+# decodes statement at offset, returns it with offset of the next one,
+# which is past the end of data when it should be parsed from stream instead
+OpDecoder = Callable[[int, bytes, int], tuple[Statement | None, int]]
+ArgReader = Callable[[bytes, int], tuple[ScriptArg | None, int]]
+
+VALUE_SPECS = frozenset({ARG_BYTE, ARG_WORD, ARG_DWORD})
+
+ESCAPE = 0xFF
+ESCAPE_NO_VAR = frozenset({1, 2, 3, 8})
+
+
+def read_value(
+    cls: type[ByteValue | WordValue | DWordValue],
+    size: int,
+    data: bytes,
+    pos: int,
+) -> tuple[ScriptArg, int]:
+    return cls.from_op(data[pos : pos + size]), pos + size
+
+
+def read_ref(word_size: int, data: bytes, pos: int) -> tuple[ScriptArg, int]:
+    end = pos + word_size
+    rel = int.from_bytes(data[pos:end], byteorder='little', signed=True)
+    return RefOffset.from_rel(rel, end, word_size), end
+
+
+def read_msg(var_size: int, data: bytes, pos: int) -> tuple[ScriptArg | None, int]:
+    end = len(data)
+    nul = data.find(0, pos)
+    if nul < 0:
+        return None, end + 1
+    if data.find(ESCAPE, pos, nul) < 0:
+        return CString.from_msg(data[pos:nul]), nul + 1
+    # escape codes may contain zero bytes, scan them one by one
+    start = pos
+    while pos < end:
+        c = data[pos]
+        if c == 0:
+            return CString.from_msg(data[start:pos]), pos + 1
+        pos += 1
+        if c == ESCAPE:
+            if pos >= end:
+                break
+            pos += 1 if data[pos] in ESCAPE_NO_VAR else 1 + var_size
+    return None, end + 1
+
+
+def arg_reader(spec: ArgSpec) -> ArgReader:
+    cls, size = spec
+    if cls is CString:
+        return partial(read_msg, size)
+    if cls is RefOffset:
+        return partial(read_ref, size)
+    return partial(read_value, cls, size)  # type: ignore[arg-type]
+
+
+def compile_layout(name: str, layout: ArgLayout) -> OpDecoder:
+    head_specs, tail_specs = layout
+    head = tuple(arg_reader(spec) for spec in head_specs)
+    tails = {
+        cmd: tuple(arg_reader(spec) for spec in specs)
+        for cmd, specs in tail_specs.items()
+    }
+
+    def decode(opcode: int, data: bytes, offset: int) -> tuple[Statement | None, int]:
+        pos = offset + 1
+        args = []
+        for read in head:
+            arg, pos = read(data, pos)
+            args.append(arg)
+        if tails and pos <= len(data):
+            for read in tails.get(data[offset + 1], ()):
+                arg, pos = read(data, pos)
+                args.append(arg)
+        if pos > len(data):
+            return None, pos
+        return Statement.from_args(name, opcode, offset, tuple(args)), pos
+
+    return decode
+
+
+class FixedOp(NamedTuple):
+    """Op without arguments or with a single immediate value, decoded inline."""
+
+    name: str
+    size: int
+    value_type: type[ByteValue | WordValue | DWordValue] | None
+
+
+@dataclass(frozen=True)
+class CompiledOpTable:
+    fixed: Mapping[int, FixedOp]
+    decoders: Mapping[int, OpDecoder]
+
+
+def compile_optable(opcodes: OpTable) -> CompiledOpTable:
+    """Decoders for opcodes with a known argument layout."""
+    fixed = {}
+    decoders = {}
+    for opcode, makeop in opcodes.items():
+        if not isinstance(makeop, partial) or makeop.func is not Statement:
+            continue
+        name, op = makeop.args
+        layout = ARG_LAYOUTS.get(op)
+        if layout is None:
+            continue
+        head, tails = layout
+        if not head and not tails:
+            fixed[opcode] = FixedOp(name, 0, None)
+        elif not tails and len(head) == 1 and head[0] in VALUE_SPECS:
+            ((value_type, size),) = head
+            fixed[opcode] = FixedOp(name, size, value_type)  # type: ignore[arg-type]
+        else:
+            decoders[opcode] = compile_layout(name, layout)
+    return CompiledOpTable(fixed, decoders)
+
+
+_compiled: dict[int, tuple[OpTable, CompiledOpTable]] = {}
+
+
+def get_compiled(opcodes: OpTable) -> CompiledOpTable:
+    # op tables are module level dictionaries, keep a reference along
+    # so the id is not reused
+    cached = _compiled.get(id(opcodes))
+    if cached is None or cached[0] is not opcodes:
+        cached = _compiled[id(opcodes)] = (opcodes, compile_optable(opcodes))
+    return cached[1]
@@ -243,6 +243,70 @@ def msg_op_v8(stream: IO[bytes]) -> Iterable[ScriptArg]:
     return (CString(stream, var_size=4),)
 
 
+ArgSpec = tuple[type[ScriptArg], int]
+ArgLayout = tuple[tuple[ArgSpec, ...], Mapping[int, tuple[ArgSpec, ...]]]
+
+ARG_BYTE: ArgSpec = (ByteValue, 1)
+ARG_WORD: ArgSpec = (WordValue, 2)
+ARG_DWORD: ArgSpec = (DWordValue, 4)
+ARG_REF: ArgSpec = (RefOffset, 2)
+ARG_DREF: ArgSpec = (RefOffset, 4)
+ARG_MSG: ArgSpec = (CString, 2)
+ARG_MSG_V8: ArgSpec = (CString, 4)
+
+
+def subop_layout(
+    head: tuple[ArgSpec, ...],
+    tails: Mapping[tuple[int, ...], tuple[ArgSpec, ...]],
+) -> ArgLayout:
+    return head, {cmd: tail for cmds, tail in tails.items() for cmd in cmds}
+
+
+# argument layouts of the op functions above, for table driven decoding:
+# head arguments followed by tail arguments selected by value of first argument
+# NOTE: keep in sync with the op functions, ini_op_v71 can only be parsed from stream
+ARG_LAYOUTS: Mapping[Callable[[IO[bytes]], Iterable[ScriptArg]], ArgLayout] = {
+    simple_op: ((), {}),
+    extended_b_op: ((ARG_BYTE,), {}),
+    extended_w_op: ((ARG_WORD,), {}),
+    extended_ww_op: ((ARG_WORD, ARG_WORD), {}),
+    extended_dw_op: ((ARG_DWORD,), {}),
+    extended_ddw_op: ((ARG_DWORD, ARG_DWORD), {}),
+    extended_bw_op: ((ARG_BYTE, ARG_WORD), {}),
+    extended_bdw_op: ((ARG_BYTE, ARG_DWORD), {}),
+    jump_cmd: ((ARG_REF,), {}),
+    djump_cmd: ((ARG_DREF,), {}),
+    msg_cmd: subop_layout((ARG_BYTE,), {(75, 194): (ARG_MSG,)}),
+    msg_cmd_v8: subop_layout((ARG_BYTE,), {(209,): (ARG_MSG_V8,)}),
+    msg_cmd_he100: subop_layout((ARG_BYTE,), {(35, 79): (ARG_MSG,)}),
+    actor_ops_v8: subop_layout((ARG_BYTE,), {(0x71,): (ARG_MSG_V8,)}),
+    actor_ops_v6: subop_layout((ARG_BYTE,), {(0x58,): (ARG_MSG,)}),
+    verb_ops_v8: subop_layout((ARG_BYTE,), {(0x99, 0xA4): (ARG_MSG_V8,)}),
+    verb_ops_v6: subop_layout((ARG_BYTE,), {(0x7D,): (ARG_MSG,)}),
+    array_ops: subop_layout(
+        (ARG_BYTE, ARG_WORD),
+        {(127,): (ARG_WORD,), (138,): (ARG_WORD, ARG_WORD)},
+    ),
+    room_ops_he60: subop_layout((ARG_BYTE,), {(221,): (ARG_MSG,)}),
+    actor_ops_he60: subop_layout((ARG_BYTE,), {(225,): (ARG_MSG,)}),
+    array_ops_v6: subop_layout((ARG_BYTE, ARG_WORD), {(205,): (ARG_MSG,)}),
+    array_ops_v8: subop_layout((ARG_BYTE, ARG_DWORD), {(0x14,): (ARG_MSG_V8,)}),
+    array_ops_he100: subop_layout(
+        (ARG_BYTE, ARG_WORD),
+        {(131,): (ARG_WORD,), (132,): (ARG_WORD, ARG_WORD)},
+    ),
+    wait_ops: subop_layout((ARG_BYTE,), {(168, 226, 232): (ARG_REF,)}),
+    wait_ops_v8: subop_layout((ARG_BYTE,), {(30, 34, 35): (ARG_DREF,)}),
+    wait_ops_he100: subop_layout((ARG_BYTE,), {(128,): (ARG_REF,)}),
+    file_op: subop_layout((ARG_BYTE,), {(8,): (ARG_BYTE,)}),
+    file_op_he100: subop_layout((ARG_BYTE,), {(5,): (ARG_BYTE,)}),
+    msg_op: ((ARG_MSG,), {}),
+    sys_msg: ((ARG_BYTE, ARG_MSG), {}),
+    dmsg_op: ((ARG_MSG, ARG_MSG), {}),
+    msg_op_v8: ((ARG_MSG_V8,), {}),
+}
+
+
 def makeop(
     name: str,
     op: Callable[[IO[bytes]], Iterable[ScriptArg]] = simple_op,
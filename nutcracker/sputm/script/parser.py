@@ -1,5 +1,5 @@
 from collections.abc import Callable, Iterable, Iterator
-from typing import IO
+from typing import IO, Self
 
 
 def read_message(
@@ -28,6 +28,12 @@ class CString(ScriptArg):
     def __init__(self, stream: IO[bytes], var_size: int = 2) -> None:
         self.msg = b''.join(read_message(stream, escape=b'\xff', var_size=var_size))
 
+    @classmethod
+    def from_msg(cls, msg: bytes) -> Self:
+        arg = cls.__new__(cls)
+        arg.msg = msg
+        return arg
+
     def __repr__(self) -> str:
         return f'MSG {self.msg!r}'
 
@@ -40,6 +46,12 @@ class ByteValue(ScriptArg):
     def __init__(self, stream: IO[bytes]) -> None:
         self.op = stream.read(1)
 
+    @classmethod
+    def from_op(cls, op: bytes) -> Self:
+        arg = cls.__new__(cls)
+        arg.op = op
+        return arg
+
     def __repr__(self) -> str:
         return f'BYTE hex=0x{ord(self.op):02x} dec={ord(self.op)}'
 
@@ -51,6 +63,12 @@ class WordValue(ScriptArg):
     def __init__(self, stream: IO[bytes]) -> None:
         self.op = stream.read(2)
 
+    @classmethod
+    def from_op(cls, op: bytes) -> Self:
+        arg = cls.__new__(cls)
+        arg.op = op
+        return arg
+
     def __repr__(self) -> str:
         val = int.from_bytes(self.op, byteorder='little', signed=True)
         return f'WORD hex=0x{val:04x} dec={val}'
@@ -63,6 +81,12 @@ class DWordValue(ScriptArg):
     def __init__(self, stream: IO[bytes]) -> None:
         self.op = stream.read(4)
 
+    @classmethod
+    def from_op(cls, op: bytes) -> Self:
+        arg = cls.__new__(cls)
+        arg.op = op
+        return arg
+
     def __repr__(self) -> str:
         val = int.from_bytes(self.op, byteorder='little', signed=True)
         return f'DWORD hex=0x{val:04x} dec={val}'
@@ -78,6 +102,14 @@ class RefOffset(ScriptArg):
         self.size = word_size
         self.abs = rel + self.endpos
 
+    @classmethod
+    def from_rel(cls, rel: int, endpos: int, word_size: int = 2) -> Self:
+        arg = cls.__new__(cls)
+        arg.endpos = endpos
+        arg.size = word_size
+        arg.abs = rel + endpos
+        return arg
+
     @property
     def rel(self) -> int:
         return self.abs - self.endpos
@@ -104,6 +136,21 @@ class Statement:
         self.offset = stream.tell() - 1
         self.args = tuple(op(stream))
 
+    @classmethod
+    def from_args(
+        cls,
+        name: str,
+        opcode: int,
+        offset: int,
+        args: tuple[ScriptArg, ...],
+    ) -> Self:
+        stat = cls.__new__(cls)
+        stat.name = name
+        stat.opcode = opcode
+        stat.offset = offset
+        stat.args = args
+        return stat
+
     def __repr__(self) -> str:
         return ' '.join(
             [f'0x{self.opcode:02x}', self.name, '{', *(str(x) for x in self.args), '}'],
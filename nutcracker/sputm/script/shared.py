@@ -91,6 +91,10 @@ class ScriptError(ValueError):
         self.stat = stat
         self.stack = stack
 
+    def __reduce__(self) -> tuple[type[ValueError], tuple[str]]:
+        # script state is not picklable, pass only the message between processes
+        return ValueError, (str(self),)
+
 
 def realize_refs(srefs, hrefs, seq):
     refs = {label: label in hrefs for label in sorted(srefs | hrefs)}
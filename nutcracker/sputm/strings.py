@@ -7,14 +7,14 @@ from typing import TypedDict
 
 from nutcracker.kernel2.element import Element
 from nutcracker.sputm.script.bytecode import (
+    Verify,
     descumm,
     get_strings,
     global_script,
     local_script,
     local_script_v7,
     local_script_v8,
-    to_bytes,
-    update_strings,
+    update_script_strings,
     verb_script,
 )
 from nutcracker.sputm.script.opcodes import (
@@ -48,10 +48,11 @@ def get_all_scripts(
     root: Iterable[Element],
     opcodes: OpTable,
     script_map: Mapping[str, Callable[[bytes], tuple[bytes, bytes]]],
+    verify: Verify = Verify.OFF,
 ) -> Iterator[bytes]:
     for elem in root:
         if elem.tag in {'OBNA', 'TEXT'}:
-            msg, rest = elem.data.split(b'\x00', maxsplit=1)
+            msg, rest = bytes(elem.data).split(b'\x00', maxsplit=1)
             assert rest == b''
             if msg != b'':
                 yield msg
@@ -59,11 +60,16 @@ def get_all_scripts(
             if elem.tag in script_map:
                 # print('==================', elem.attribs['path'])
                 _, script_data = script_map[elem.tag](elem.data)
-                bytecode = descumm(script_data, opcodes)
+                bytecode = descumm(script_data, opcodes, verify=verify)
                 for msg in get_strings(bytecode):
                     yield msg.msg
             else:
-                yield from get_all_scripts(elem.children(), opcodes, script_map)
+                yield from get_all_scripts(
+                    elem.children(),
+                    opcodes,
+                    script_map,
+                    verify,
+                )
 
 
 def parse_verb_meta(meta):
@@ -91,6 +97,7 @@ def update_element_strings(
     strings: Iterator[bytes],
     opcodes: OpTable,
     script_map: Mapping[str, Callable[[bytes], tuple[bytes, bytes]]],
+    verify: Verify = Verify.OFF,
 ) -> Iterator[Element]:
     offset = 0
     strings = iter(strings)
@@ -101,17 +108,19 @@ def update_element_strings(
         elif elem.tag in {'LECF', 'LFLF', 'RMDA', 'ROOM', 'OBCD', 'TLKE', *script_map}:
             if elem.tag in script_map:
                 serial, script_data = script_map[elem.tag](elem.data)
-                bc = descumm(script_data, opcodes)
-                updated = update_strings(bc, strings)
-                if elem.tag == 'VERB':
-                    pref = list(parse_verb_meta(serial))
-                    comp = compose_verb_meta(pref)
-                    assert comp == serial, (comp, serial, pref)
-                    entries = [(idx, bc[off - 8].offset + 8) for idx, off in pref]
-                    serial = compose_verb_meta(entries)
-                attribs = elem.attribs
-                elem.update_raw(serial + to_bytes(updated))
-                elem.attribs = attribs
+                bc = descumm(script_data, opcodes, verify=verify)
+                _, updated_data = update_script_strings(script_data, bc, strings)
+                # scripts without changed messages are kept as is
+                if updated_data is not script_data:
+                    if elem.tag == 'VERB':
+                        pref = list(parse_verb_meta(serial))
+                        comp = compose_verb_meta(pref)
+                        assert comp == serial, (comp, serial, pref)
+                        entries = [(idx, bc[off - 8].offset + 8) for idx, off in pref]
+                        serial = compose_verb_meta(entries)
+                    attribs = elem.attribs
+                    elem.update_raw(bytes(serial) + updated_data)
+                    elem.attribs = attribs
             else:
                 elem.update_children(
                     update_element_strings(
@@ -119,10 +128,11 @@ def update_element_strings(
                         strings,
                         opcodes,
                         script_map,
+                        verify,
                     )
                 )
-        offset += len(elem.data) + 8
-        elem.attribs['size'] = len(elem.data)
+        offset += elem.data_size + 8
+        elem.attribs['size'] = elem.data_size
         yield elem
 
 
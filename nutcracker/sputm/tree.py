@@ -1,14 +1,30 @@
 #!/usr/bin/env python3
 
+import multiprocessing
 import os
 import struct
-from collections.abc import Callable, Container, Iterator, Mapping
+from collections.abc import Callable, Container, Iterable, Iterator, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from dataclasses import dataclass
 from typing import Any
 
-from nutcracker.kernel2.chunk import Chunk
+import numpy as np
+
+from nutcracker.kernel2.arena import map_arena
+from nutcracker.kernel2.chunk import ArrayBuffer, Chunk
 from nutcracker.kernel2.element import Element
 from nutcracker.kernel2.fileio import ResourceFile
+from nutcracker.kernel2.index import (
+    FileStamp,
+    element_columns,
+    elements_from_columns,
+    expand,
+    index_key,
+    load_indexed,
+    map_chunks_indexed,
+    store_indexed,
+)
 from nutcracker.kernel2.preset import Preset
 
 from .index import (
@@ -72,88 +88,329 @@ def save_tree(
             f.write(bytes(cfg.mktag(element.tag, element.data)))
 
 
+class ElementPathResolver:
+    """Assign path and gid attributes to elements mapped from a disk file."""
+
+    def __init__(
+        self,
+        config: GameResourceConfig,
+        idgens: dict[str, IdGen],
+        didx: int,
+    ) -> None:
+        self.config = config
+        self.idgens = idgens
+        self.didx = didx
+        self.paths: set[str] = set()
+        self.wraps: dict[str, dict[int, int]] = {}
+
+    def update_room_offsets(self, data: ArrayBuffer) -> None:
+        """Resolve ids of following LFLF chunks by offsets in LOFF data."""
+        offs = dict(read_directory(data))
+
+        # # to ignore cloned rooms
+        # droo = idgens['LFLF']
+        # droo = {k: v for k, v  in droo.items() if v == (didx + 1, 0)}
+        # droo = {k: (disk, offs[k]) for k, (disk, _)  in droo.items()}
+
+        droo = {k: (self.didx + 1, v) for k, v in offs.items()}
+        self.idgens['LFLF'] = compare_pid_off(droo, 16 - self.config.base_fix)
+
+    def restore(self, root: Iterable[Element]) -> None:
+        """Replay updates of shared id generators for tree loaded from index."""
+        for disk in root:
+            for elem in disk.children():
+                if elem.tag == 'LOFF':
+                    self.update_room_offsets(elem.data)
+
+    def __call__(
+        self,
+        parent: Element | None,
+        chunk: Chunk,
+        offset: int,
+    ) -> dict[str, Any]:
+        idgens, wraps = self.idgens, self.wraps
+        if chunk.tag == 'LOFF':
+            # should not happen in HE games
+            self.update_room_offsets(chunk.data)
+
+        get_gid = idgens.get(chunk.tag)
+        gid: int | None
+        if not parent:
+            gid = self.didx + 1
+        elif parent.attribs['path'] in wraps:
+            gid = wraps[parent.attribs['path']].get(offset)
+        else:
+            gid = get_gid and get_gid(
+                parent and parent.attribs['gid'],
+                chunk.data,
+                offset,
+            )
+
+        base = chunk.tag + (
+            f'_{gid:04d}' if gid is not None else '' if not get_gid else f'_o_{offset:04X}'
+        )
+
+        dirname = parent.attribs['path'] if parent else ''
+        path = os.path.join(dirname, base)
+
+        if path in self.paths:
+            path += 'd'
+        # assert path not in paths, path
+        self.paths.add(path)
+
+        if chunk.tag == 'WRAP':
+            _, offs = sputm.untag(chunk.data)
+            offsets = np.frombuffer(offs.data, dtype='<u4', count=len(offs.data) // 4)
+            wraps[path] = dict(zip(offsets.tolist(), range(1, len(offsets) + 1), strict=True))
+
+        res = {'path': path, 'gid': gid}
+        return res
+
+
 def read_game_resources(
-    game: Game, config: GameResourceConfig, idgens: dict[str, IdGen], **kwargs: Any
+    game: Game,
+    config: GameResourceConfig,
+    idgens: dict[str, IdGen],
+    *,
+    use_index: bool = False,
+    flyweight: bool = False,
+    workers: int = 1,
+    select: str | None = None,
+    **kwargs: Any,
 ) -> Iterator[Element]:
-    _, *disks = game.disks
+    """Map disk files of game into element trees.
+
+    With `workers` > 1, rooms of all disks are mapped in a process pool,
+    elements are yielded in the same order as when mapped sequentially.
+    Workers share disk files loaded by the main process, which rebuilds
+    mapped rooms from their index columns, so it only pays off on large
+    disks with several CPUs available.
+    Process pool requires `fork` start method, otherwise falls back to
+    sequential mapping.
+
+    With `use_index`, mapped trees are stored in sidecar index files next
+    to disk files and loaded from them when they are up to date.
+
+    With `select` path pattern (e.g. `LECF/LFLF_0042/RMDA/OBCD*`), only
+    subtrees leading to matching elements are mapped, see `select_chunks`.
+    Disk roots without any match are skipped.
+    Selection maps directly, ignoring index, flyweight and workers options.
+    """
+    index_file, *disks = game.disks
+
+    if select is not None:
+        for didx, disk in enumerate(disks):
+            disk_path = os.path.join(game.basedir, disk)
+            with ResourceFile.load(disk_path, key=game.chiper_key) as resource:
+                cfg = sputm(**kwargs, extra=ElementPathResolver(config, idgens, didx))
+                # LOFF updates room ids for following LFLF chunks
+                yield from cfg.select_chunks(resource, select, keep={'LOFF'})
+        return
+
+    index_stamp = FileStamp.from_path(os.path.join(game.basedir, index_file))
+
+    if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        yield from _read_game_resources_parallel(
+            game,
+            config,
+            idgens,
+            index_stamp,
+            use_index=use_index,
+            flyweight=flyweight,
+            workers=workers,
+            **kwargs,
+        )
+        return
 
     for didx, disk in enumerate(disks):
-        with ResourceFile.load(
-            os.path.join(game.basedir, disk), key=game.chiper_key
-        ) as resource:
+        disk_path = os.path.join(game.basedir, disk)
+        with ResourceFile.load(disk_path, key=game.chiper_key) as resource:
             # # commented out, use pre-calculated index instead,
             # # as calculating is time-consuming
             # s = sputm.generate_schema(resource)
             # pprint.pprint(s)
             # root = sputm.map_chunks(resource, idgen=idgens, schema=s)
 
-            paths: dict[str, Chunk] = {}
-            wraps: dict[str, dict[int, int]] = {}
-
-            def update_element_path(
-                parent: Element | None,
-                chunk: Chunk,
-                offset: int,
-            ) -> dict[str, Any]:
-                if chunk.tag == 'LOFF':
-                    # should not happen in HE games
-
-                    offs = dict(read_directory(chunk.data))
-
-                    # # to ignore cloned rooms
-                    # droo = idgens['LFLF']
-                    # droo = {k: v for k, v  in droo.items() if v == (didx + 1, 0)}
-                    # droo = {k: (disk, offs[k]) for k, (disk, _)  in droo.items()}
-
-                    droo = {k: (didx + 1, v) for k, v in offs.items()}
-                    idgens['LFLF'] = compare_pid_off(droo, 16 - config.base_fix)
-
-                get_gid = idgens.get(chunk.tag)
-                gid: int | None
-                if not parent:
-                    gid = didx + 1
-                elif parent.attribs['path'] in wraps:
-                    gid = wraps[parent.attribs['path']].get(offset)
-                else:
-                    gid = get_gid and get_gid(
-                        parent and parent.attribs['gid'],
-                        chunk.data,
-                        offset,
-                    )
+            resolver = ElementPathResolver(config, idgens, didx)
+            cfg = sputm(**kwargs, extra=resolver)
+            if not use_index:
+                if flyweight:
+                    yield from map_arena(cfg, resource).root()
+                    continue
+                # yield from sputm(**kwargs).map_chunks(resource, extra=update_element_path)
+                yield from cfg.map_chunks(resource)
+                continue
+
+            root = map_chunks_indexed(
+                cfg,
+                resource,
+                _index_path(game, config, cfg, disk_path),
+                (FileStamp.from_path(disk_path), index_stamp),
+                flyweight=flyweight,
+            )
+            resolver.restore(root)
+            yield from root
+
+
+def _index_path(
+    game: Game,
+    config: GameResourceConfig,
+    cfg: Preset,
+    disk_path: str,
+) -> str:
+    key = index_key(
+        cfg,
+        game.version,
+        game.he_version,
+        game.chiper_key,
+        config.base_fix,
+    )
+    return f'{disk_path}.{key}.idx'
 
-                base = chunk.tag + (
-                    f'_{gid:04d}'
-                    if gid is not None
-                    else ''
-                    if not get_gid
-                    else f'_o_{offset:04X}'
-                )
 
-                dirname = parent.attribs['path'] if parent else ''
-                path = os.path.join(dirname, base)
-
-                if path in paths:
-                    path += 'd'
-                # assert path not in paths, path
-                paths[path] = chunk
-
-                if chunk.tag == 'WRAP':
-                    _, offs = sputm.untag(chunk.data)
-                    size = len(offs.data) // 4
-                    offs = dict(
-                        zip(
-                            struct.unpack(f'<{size}I', offs.data),
-                            range(1, size + 1),
-                            strict=True,
-                        ),
-                    )
-                    wraps[path] = offs
+ROOM_BATCHES_PER_WORKER = 4
 
-                res = {'path': path, 'gid': gid}
-                return res
+_room_worker: tuple[
+    Game,
+    GameResourceConfig,
+    dict[str, IdGen],
+    dict[str, Any],
+    list[ArrayBuffer],
+]
 
-            # yield from sputm(**kwargs).map_chunks(resource, extra=update_element_path)
-            yield from sputm(**kwargs, extra=update_element_path).map_chunks(resource)
+
+def _init_room_worker(
+    game: Game,
+    config: GameResourceConfig,
+    idgens: dict[str, IdGen],
+    kwargs: dict[str, Any],
+    resources: list[ArrayBuffer],
+) -> None:
+    # passed on fork, id generators are closures which cannot be pickled
+    # and disk files are shared with the parent instead of loaded again
+    global _room_worker  # noqa: PLW0603
+    _room_worker = (game, config, idgens, kwargs, resources)
+
+
+def _map_rooms(
+    didx: int,
+    rooms: list[tuple[int, dict[str, Any], dict[int, int] | None]],
+) -> list[dict[str, Any]]:
+    """Map descendants of rooms at given positions in disk to index columns."""
+    _, config, idgens, kwargs, resources = _room_worker
+    resource = resources[didx]
+    resolver = ElementPathResolver(config, idgens, didx)
+    cfg = sputm(**kwargs, extra=resolver)
+    hsize = cfg.header_dtype.itemsize()
+    results = []
+    for pos, attribs, wraps in rooms:
+        if wraps is not None:
+            resolver.wraps[attribs['path']] = wraps
+        header = cfg.header_dtype.from_buffer(resource[pos - hsize : pos])
+        room = Element(cfg, Chunk(header, resource[pos : pos + attribs['size']]), attribs)
+        children = list(room.children())
+        expand(children)
+        results.append(element_columns(cfg, children, base=pos))
+    return results
+
+
+def _read_game_resources_parallel(
+    game: Game,
+    config: GameResourceConfig,
+    idgens: dict[str, IdGen],
+    index_stamp: FileStamp,
+    *,
+    use_index: bool,
+    flyweight: bool,
+    workers: int,
+    **kwargs: Any,
+) -> Iterator[Element]:
+    _, *disks = game.disks
+    with ExitStack() as stack:
+        pending = []
+        for didx, disk in enumerate(disks):
+            disk_path = os.path.join(game.basedir, disk)
+            resource = stack.enter_context(
+                ResourceFile.load(disk_path, key=game.chiper_key),
+            )
+            resolver = ElementPathResolver(config, idgens, didx)
+            cfg = sputm(**kwargs, extra=resolver)
+            index_path = _index_path(game, config, cfg, disk_path)
+            stamps = (FileStamp.from_path(disk_path), index_stamp)
+
+            root = (
+                load_indexed(cfg, resource, index_path, stamps, flyweight=flyweight)
+                if use_index
+                else None
+            )
+            if root is not None:
+                resolver.restore(root)
+                pending.append((cfg, resource, index_path, stamps, root, [], False))
+                continue
+
+            hsize = cfg.header_dtype.itemsize()
+            root = list(cfg.map_chunks(resource))
+            rooms = []
+            for disk_elem in root:
+                base = disk_elem.attribs['offset'] + hsize
+                for room in disk_elem.children():
+                    if not cfg.schema.get(room.tag):
+                        continue
+                    task = (
+                        base + room.attribs['offset'] + hsize,
+                        room.attribs,
+                        resolver.wraps.get(room.attribs['path']),
+                    )
+                    rooms.append((room, task))
+            pending.append((cfg, resource, index_path, stamps, root, rooms, True))
+
+        batches: list[list[tuple[list[Element], Any]]] = [[] for _ in pending]
+        if any(rooms for *_, rooms, _ in pending):
+            # fork workers only after all disks are loaded so they share them
+            pool = stack.enter_context(
+                ProcessPoolExecutor(
+                    workers,
+                    mp_context=multiprocessing.get_context('fork'),
+                    initializer=_init_room_worker,
+                    initargs=(
+                        game,
+                        config,
+                        idgens,
+                        kwargs,
+                        [resource for _, resource, *_ in pending],
+                    ),
+                ),
+            )
+            # submit rooms of all disks before collecting any of them
+            for didx, (*_, rooms, _) in enumerate(pending):
+                size = max(1, -(-len(rooms) // (workers * ROOM_BATCHES_PER_WORKER)))
+                for start in range(0, len(rooms), size):
+                    batch = rooms[start : start + size]
+                    future = pool.submit(
+                        _map_rooms,
+                        didx,
+                        [task for _, task in batch],
+                    )
+                    batches[didx].append(([room for room, _ in batch], future))
+
+        for didx, (cfg, resource, index_path, stamps, root, _, mapped) in enumerate(
+            pending,
+        ):
+            for rooms, future in batches[didx]:
+                for room, columns in zip(rooms, future.result(), strict=True):
+                    room._children = elements_from_columns(cfg, resource, columns)
+            if mapped and use_index:
+                root = store_indexed(
+                    cfg,
+                    resource,
+                    index_path,
+                    stamps,
+                    root,
+                    flyweight=flyweight,
+                )
+            elif mapped and flyweight:
+                root = map_arena(cfg, resource, root).root()
+            yield from root
 
 
 def create_config(game: Game) -> GameResourceConfig:
@@ -189,8 +446,10 @@ def open_game_resource(
     filename: str | os.PathLike[str],
     version: tuple[int, int] | None = None,
     chiper_key: int | None = None,
+    *,
+    use_index: bool = False,
 ) -> GameResource:
-    game = load_resource(filename, chiper_key=chiper_key)
+    game = load_resource(filename, chiper_key=chiper_key, use_index=use_index)
 
     if version:
         game.version, game.he_version = version
@@ -205,13 +464,21 @@ def dump_resources(
     gameres: GameResource,
     basename: str,
     schema: Mapping[str, set] | None = None,
+    workers: int = 1,
+    select: str | None = None,
+    use_index: bool = False,
 ) -> None:
     schema = schema or narrow_schema(
         SCHEMA,
         {'LECF', 'LFLF', 'RMDA', 'ROOM'},
     )
     os.makedirs(basename, exist_ok=True)
-    root = gameres.read_resources(schema=schema)
+    root = gameres.read_resources(
+        schema=schema,
+        workers=workers,
+        select=select,
+        use_index=use_index,
+    )
     with open(os.path.join(basename, 'rpdump.xml'), 'w') as f:
         for disk in root:
             sputm.render(disk, stream=f)
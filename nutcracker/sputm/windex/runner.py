@@ -1,17 +1,30 @@
 import functools
+import json
+import multiprocessing
 import os
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 from pathlib import Path
 
 import typer
 
+from nutcracker.kernel2.element import Element
+from nutcracker.utils.cache import ContentCache
+
 from .. import windex_v5, windex_v6
 from ..preset import sputm
 from ..schema import SCHEMA
-from ..script.bytecode import script_map
-from ..strings import RAW_ENCODING
+from ..script.bytecode import (
+    BytecodeParseError,
+    BytecodeVerifyError,
+    Verify,
+    descumm,
+    script_map,
+)
+from ..strings import RAW_ENCODING, get_optable, get_script_map
 from ..tree import narrow_schema, open_game_resource
-from .scu import dump_script_file
+from .dump import dump_script_file
 
 app = typer.Typer()
 
@@ -38,6 +51,86 @@ Version = Enum(  # type: ignore[misc]
     dict(zip(SUPPORTED_VERSION.keys(), SUPPORTED_VERSION.keys(), strict=True)),
 )
 
+Decompiler = Callable[[Element], Iterator[str]]
+
+
+class CachedDecompiler:
+    """Reuse decompiled lines of unchanged scripts from a content cache.
+
+    Lines are keyed by the script bytes along with the decompiler parameters.
+    Resource path and id are part of the key too, as the decompiled block
+    header names both, e.g. `script 10 { ; SCRP LECF_0001/LFLF_0001/SCRP_0010`.
+    """
+
+    def __init__(
+        self,
+        decompile: Decompiler,
+        cache: ContentCache,
+        *params: str,
+    ) -> None:
+        self.decompile = decompile
+        self.cache = cache
+        self.params = params
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, elem: Element) -> Iterator[str]:
+        key = self.cache.key(
+            *self.params,
+            elem.tag,
+            elem.attribs['path'],
+            str(elem.attribs['gid']),
+            bytes(elem.data),
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            yield from json.loads(cached)
+            return
+        self.misses += 1
+        lines = []
+        for line in self.decompile(elem):
+            lines.append(line)
+            yield line
+        self.cache.put(key, json.dumps(lines).encode())
+
+    def stats(self) -> tuple[int, int]:
+        return self.hits, self.misses
+
+
+_decompile_worker: tuple[list[tuple[str, Element, str]], Decompiler]
+
+
+def write_script_file(
+    fname: str,
+    room_no: str,
+    room: Element,
+    decompile: Decompiler,
+) -> None:
+    with open(fname, 'w', **RAW_ENCODING) as script_file:
+        dump_script_file(room_no, room, decompile, script_file)
+
+
+def _init_decompile_worker(
+    rooms: list[tuple[str, Element, str]],
+    decompile: Decompiler,
+) -> None:
+    # passed on fork, elements are views of memory mapped resources
+    global _decompile_worker  # noqa: PLW0603
+    _decompile_worker = (rooms, decompile)
+
+
+def _decompile_room(idx: int) -> tuple[int, int]:
+    """Write script file of room, returns cache hits and misses for it."""
+    rooms, decompile = _decompile_worker
+    room_no, room, fname = rooms[idx]
+    if not isinstance(decompile, CachedDecompiler):
+        write_script_file(fname, room_no, room, decompile)
+        return 0, 0
+    hits, misses = decompile.stats()
+    write_script_file(fname, room_no, room, decompile)
+    return decompile.hits - hits, decompile.misses - misses
+
 
 @app.command('decompile')
 def decompile(
@@ -60,11 +153,34 @@ def decompile(
         '--skip-transform',
         help='Disable structure simplification',
     ),
+    select: str = typer.Option(
+        None,
+        '--select',
+        '-s',
+        help='Decompile only resources matching path pattern, e.g. LECF/LFLF_0042',
+    ),
+    jobs: int = typer.Option(1, '--jobs', '-j', help='Worker processes'),
+    cache_dir: Path = typer.Option(
+        None,
+        '--cache-dir',
+        help='Reuse decompiled scripts from this directory',
+    ),
+    cache_size: int = typer.Option(
+        256,
+        '--cache-size',
+        help='Maximum cache size in MiB',
+    ),
+    index: bool = typer.Option(
+        False,
+        '--index',
+        help='Reuse chunk index stored next to game resource files',
+    ),
 ) -> None:
     gameres = open_game_resource(
         filename,
         SUPPORTED_VERSION.get(gver.name) if gver else None,
         int(chiper_key, 16) if chiper_key else None,
+        use_index=index,
     )
     basename = gameres.basename
 
@@ -73,6 +189,8 @@ def decompile(
             SCHEMA,
             {'LECF', 'LFLF', 'RMDA', 'ROOM', 'OBCD', *script_map},
         ),
+        select=select,
+        use_index=index,
     )
 
     rnam = gameres.rooms
@@ -82,6 +200,7 @@ def decompile(
     script_dir = os.path.join('scripts', basename)
     os.makedirs(script_dir, exist_ok=True)
 
+    windex = windex_v6 if gameres.game.version >= 6 else windex_v5
     if gameres.game.version >= 6:
         decompile = functools.partial(
             windex_v6.decompile_script,
@@ -95,18 +214,114 @@ def decompile(
             transform=not skip_transform,
         )
 
+    if cache_dir:
+        decompile = CachedDecompiler(
+            decompile,
+            ContentCache(cache_dir, max_size=cache_size << 20),
+            windex.__name__,
+            str(windex.DECOMPILER_VERSION),
+            str(gameres.game.version),
+            str(gameres.game.he_version),
+            str(verbose),
+            str(not skip_transform),
+        )
+
+    rooms = []
     for disk in root:
         for room in sputm.findall('LFLF', disk):
             room_no = rnam.get(room.attribs['gid'], f"room_{room.attribs['gid']}")
-            print(
-                '==========================',
-                room.attribs['path'],
-                room_no,
-            )
             fname = f"{script_dir}/{room.attribs['gid']:04d}_{room_no}.scu"
+            rooms.append((room_no, room, fname))
+
+    if jobs <= 1:
+        for room_no, room, fname in rooms:
+            print('==========================', room.attribs['path'], room_no)
+            write_script_file(fname, room_no, room, decompile)
+        if isinstance(decompile, CachedDecompiler):
+            print(f'cache: {decompile.hits} hits, {decompile.misses} misses')
+        return
+
+    # every room is written to its own file, decompiler state is per script
+    with ProcessPoolExecutor(
+        jobs,
+        mp_context=multiprocessing.get_context('fork'),
+        initializer=_init_decompile_worker,
+        initargs=(rooms, decompile),
+    ) as pool:
+        futures = [pool.submit(_decompile_room, idx) for idx in range(len(rooms))]
+        hits = misses = 0
+        for (room_no, room, _), future in zip(rooms, futures, strict=True):
+            room_hits, room_misses = future.result()
+            hits, misses = hits + room_hits, misses + room_misses
+            print('==========================', room.attribs['path'], room_no)
+    if isinstance(decompile, CachedDecompiler):
+        print(f'cache: {hits} hits, {misses} misses')
+
+
+def iter_scripts(root: Iterable[Element]) -> Iterator[Element]:
+    for elem in root:
+        if elem.tag in script_map:
+            yield elem
+        elif elem.tag in {'LECF', 'LFLF', 'RMDA', 'ROOM', 'OBCD'}:
+            yield from iter_scripts(elem.children())
 
-            with open(fname, 'w', **RAW_ENCODING) as script_file:
-                dump_script_file(room_no, room, decompile, script_file)
+
+@app.command('verify')
+def verify(
+    filename: Path = typer.Argument(..., help='Game resource index file'),
+    gver: Version = typer.Option(
+        None,
+        '--game',
+        '-g',
+        help='Force game version',
+    ),
+    *,
+    chiper_key: str = typer.Option(
+        None,
+        '--chiper-key',
+        help='XOR key for decrypting game resources',
+    ),
+    mode: Verify = typer.Option(
+        Verify.FULL,
+        '--mode',
+        help='Verify every script or only a stable sample of them',
+    ),
+    select: str = typer.Option(
+        None,
+        '--select',
+        '-s',
+        help='Verify only resources matching path pattern, e.g. LECF/LFLF_0042',
+    ),
+) -> None:
+    gameres = open_game_resource(
+        filename,
+        SUPPORTED_VERSION.get(gver.name) if gver else None,
+        int(chiper_key, 16) if chiper_key else None,
+    )
+    opcodes = get_optable(gameres.game)
+    game_script_map = get_script_map(gameres.game)
+
+    root = gameres.read_resources(
+        schema=narrow_schema(
+            SCHEMA,
+            {'LECF', 'LFLF', 'RMDA', 'ROOM', 'OBCD', *script_map},
+        ),
+        select=select,
+    )
+
+    total = failed = 0
+    for disk in root:
+        for elem in iter_scripts(disk.children()):
+            _, script_data = game_script_map[elem.tag](elem.data)
+            total += 1
+            try:
+                descumm(script_data, opcodes, verify=mode)
+            except (BytecodeParseError, BytecodeVerifyError) as exc:
+                failed += 1
+                print(elem.attribs['path'], exc)
+    print(f'verified {total} scripts, {failed} failed')
+    if failed:
+        raise typer.Exit(1)
 
 
 if __name__ == '__main__':
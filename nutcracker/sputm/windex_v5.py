@@ -5,7 +5,8 @@ import operator
 import os
 from collections import OrderedDict, defaultdict, deque
 from collections.abc import Iterable
-from dataclasses import dataclass
+from contextvars import Context, ContextVar
+from dataclasses import dataclass, field
 from string import printable
 
 from nutcracker.kernel2.element import Element
@@ -27,9 +28,29 @@ from .script.opcodes_v5 import OPCODES_v5, Variable
 from .script.opcodes_v5 import value as ovalue
 
 USE_SEMANTIC_CONTEXT = False
+# bump when decompiled output changes, invalidates cached results
+DECOMPILER_VERSION = 1
 
-l_vars = {}
-semlog = defaultdict(dict)
+
+@dataclass
+class DecompilerContext:
+    """Mutable decompiler state, private to a single script."""
+
+    l_vars: dict = field(default_factory=dict)
+    obj_names: dict = field(default_factory=dict)
+    semlog: defaultdict = field(default_factory=lambda: defaultdict(dict))
+
+
+_context: ContextVar[DecompilerContext] = ContextVar('decompiler_context')
+
+
+def current_context() -> DecompilerContext:
+    try:
+        return _context.get()
+    except LookupError:
+        ctx = DecompilerContext()
+        _context.set(ctx)
+        return ctx
 
 
 def fstat(stat, *args, **kwargs):
@@ -66,8 +87,9 @@ def build_varargs(args, sep=' '):
 def value(arg, sem=None):
     res = ovalue(arg)
     if isinstance(res, Variable) and str(res).startswith('L.'):
-        l_vars[str(res)] = res
+        current_context().l_vars[str(res)] = res
     if USE_SEMANTIC_CONTEXT and sem and not isinstance(arg, Variable):
+        semlog = current_context().semlog
         res = int(res)
         if not semlog[sem].get(res):
             semlog[sem][res] = f'{sem}-{res}'
@@ -92,6 +114,7 @@ class PrintArg:
 
 
 def print_locals(indent):
+    l_vars = current_context().l_vars
     for var in sorted(l_vars.values(), key=operator.attrgetter('num')):
         yield f'{indent[:-1]}local variable {var}'
     if l_vars:
@@ -1052,9 +1075,6 @@ def o5_drawBox_wd(op):
     return fstat('draw-box {0},{1} to {3},{4} color {5:color}', *op.args)
 
 
-obj_names = {}
-
-
 def collapse_break_here(asts):
     def is_break(stat):
         return isinstance(stat, BreakHere)
@@ -1411,6 +1431,7 @@ def make_block_context(elem, gid):
     gid_str = '' if gid is None else f' {semantic_key(gid, titles[elem.tag])}'
     yield ' '.join([f'{titles[elem.tag]}{gid_str}', '{', respath_comment])
     if elem.tag == 'OBCD':
+        obj_names = current_context().obj_names
         yield ' '.join(['\tname is', f'"{obj_names[gid]}"'])
 
 
@@ -1423,7 +1444,9 @@ def get_elem_info(elem):
     pref, script_data = script_map[elem.tag](elem.data)
     entries = {}
     if elem.tag == 'VERB':
-        obj_names[gid] = msg_to_print(sputm.find('OBNA', obcd).data.split(b'\0')[0])
+        current_context().obj_names[gid] = msg_to_print(
+            bytes(sputm.find('OBNA', obcd).data).split(b'\0')[0],
+        )
         pref = list(parse_verb_meta(pref))
         entries = {off: idx[0] for idx, off in pref}
     else:
@@ -1434,7 +1457,22 @@ def get_elem_info(elem):
     return script_data, gid, entries
 
 
-def decompile_script(elem, transform=True):
+def decompile_script(elem, transform=True, semlog=None):
+    # each script runs in its own context, so no state leaks between scripts,
+    # even when several of them are decompiled concurrently,
+    # semantic names can still be collected across scripts with `semlog`
+    ctx = Context()
+    if semlog is not None:
+        ctx.run(_context.set, DecompilerContext(semlog=semlog))
+    lines = ctx.run(_decompile_script, elem, transform)
+    while True:
+        try:
+            yield ctx.run(next, lines)
+        except StopIteration:
+            return
+
+
+def _decompile_script(elem, transform=True):
     script_data, gid, entries = get_elem_info(elem)
     yield from make_block_context(elem, gid)
     indent = '\t'
@@ -1444,6 +1482,7 @@ def decompile_script(elem, transform=True):
     srefs = {0}
     asts = deque()
     res = None
+    l_vars = current_context().l_vars
     while True:
         try:
             off, stat = next(bytecode)
@@ -1508,9 +1547,10 @@ def decompile_script(elem, transform=True):
 
 if __name__ == '__main__':
     import argparse
+    import functools
 
     from nutcracker.sputm.tree import open_game_resource
-    from nutcracker.sputm.windex.scu import dump_script_file
+    from nutcracker.sputm.windex.dump import dump_script_file
 
     parser = argparse.ArgumentParser(description='read smush file')
     parser.add_argument('filename', help='filename to read from')
@@ -1533,6 +1573,7 @@ if __name__ == '__main__':
     print(gameres.game)
     print(rnam)
 
+    semlog = defaultdict(dict)
     if USE_SEMANTIC_CONTEXT:
         semlog['room'].update(rnam)
 
@@ -1550,7 +1591,12 @@ if __name__ == '__main__':
             fname = f"{script_dir}/{room.attribs['gid']:04d}_{room_no}.scu"
 
             with open(fname, 'w') as f:
-                dump_script_file(room_no, room, decompile_script, f)
+                dump_script_file(
+                    room_no,
+                    room,
+                    functools.partial(decompile_script, semlog=semlog),
+                    f,
+                )
 
     if USE_SEMANTIC_CONTEXT:
         with open(f'{script_dir}/sem.def', 'w') as f:
@@ -4,7 +4,8 @@ import operator
 import os
 from collections import OrderedDict, deque
 from collections.abc import Iterable
-from dataclasses import dataclass
+from contextvars import Context, ContextVar
+from dataclasses import dataclass, field
 from string import printable
 
 from nutcracker.kernel2.element import Element
@@ -26,6 +27,9 @@ from nutcracker.sputm.strings import (
 )
 from nutcracker.sputm.tree import narrow_schema
 
+# bump when decompiled output changes, invalidates cached results
+DECOMPILER_VERSION = 1
+
 
 class Value:
     suffix = {
@@ -120,11 +124,31 @@ class Variable:
         return f'{pref}.{num}'  # [{self.cast}]'
 
 
-g_vars = {}
-l_vars = {}
+@dataclass
+class DecompilerContext:
+    """Mutable decompiler state, private to a single script."""
+
+    g_vars: dict = field(default_factory=dict)
+    l_vars: dict = field(default_factory=dict)
+    obj_names: dict = field(default_factory=dict)
+    strings: deque = field(default_factory=deque)
+
+
+_context: ContextVar[DecompilerContext] = ContextVar('decompiler_context')
+
+
+def current_context() -> DecompilerContext:
+    try:
+        return _context.get()
+    except LookupError:
+        ctx = DecompilerContext()
+        _context.set(ctx)
+        return ctx
 
 
 def get_var(orig):
+    ctx = current_context()
+    g_vars, l_vars = ctx.g_vars, ctx.l_vars
     while isinstance(orig, Dup):
         orig = orig.orig
     key = (type(orig), Value(orig).num)
@@ -315,21 +339,21 @@ def msg_val(arg):
 
 
 def push_str(stack, msg):
-    ops['_strings'].append(msg)
+    current_context().strings.append(msg)
 
 
 def pop_str(stack):
     arr = stack.pop()
     if isinstance(arr.orig, str):
         return arr
-    return ops['_strings'].pop() if Value(arr.orig, signed=True).num == -1 else arr
+    return current_context().strings.pop() if Value(arr.orig, signed=True).num == -1 else arr
 
 
 def adr(arg):
     return f'&[{arg.abs + 8:08d}]'
 
 
-ops = {'_strings': deque()}
+ops = {}
 
 
 def regop(op):
@@ -5727,6 +5751,7 @@ def print_asts(indent, asts):
 
 
 def print_locals(indent):
+    l_vars = current_context().l_vars
     for var in sorted(l_vars.values(), key=operator.attrgetter('num')):
         yield f'{indent[:-1]}local variable {var}'
     if l_vars:
@@ -5756,6 +5781,7 @@ def make_block_context(elem, gid):
     gid_str = '' if gid is None else f' {gid}'
     yield ' '.join([f'{titles[elem.tag]}{gid_str}', '{', respath_comment])
     if elem.tag == 'OBCD':
+        obj_names = current_context().obj_names
         yield ' '.join(['\tname is', f'"{obj_names[gid]}"'])
 
 
@@ -5769,7 +5795,7 @@ def get_elem_info(game, elem):
     pref, script_data = script_map[elem.tag](elem.data)
     entries = {}
     if elem.tag == 'VERB':
-        obj_names[gid] = msg_to_print(
+        current_context().obj_names[gid] = msg_to_print(
             bytes(sputm.find('OBNA', obcd).data).split(b'\0', maxsplit=1)[0]
         )
         pref = list(parse_verb_meta(pref))
@@ -5783,6 +5809,18 @@ def get_elem_info(game, elem):
 
 
 def decompile_script(elem, game, verbose=False, transform=True):
+    # each script runs in its own context, so no state leaks between scripts,
+    # even when several of them are decompiled concurrently
+    ctx = Context()
+    lines = ctx.run(_decompile_script, elem, game, verbose, transform)
+    while True:
+        try:
+            yield ctx.run(next, lines)
+        except StopIteration:
+            return
+
+
+def _decompile_script(elem, game, verbose=False, transform=True):
     script_data, gid, entries = get_elem_info(game, elem)
     yield from make_block_context(elem, gid)
     optable = get_optable(game)
@@ -5804,7 +5842,7 @@ def decompile_script(elem, game, verbose=False, transform=True):
     #     _, var = key
     #     if str(var).startswith('L.'):
     #         del g_vars[key]
-    g_vars.clear()
+    l_vars = current_context().l_vars
 
     while True:
         try:
@@ -5885,13 +5923,11 @@ def decompile_script(elem, game, verbose=False, transform=True):
     yield '}'
 
 
-obj_names = {}
-
 if __name__ == '__main__':
     import argparse
 
     from nutcracker.sputm.tree import open_game_resource
-    from nutcracker.sputm.windex.scu import dump_script_file
+    from nutcracker.sputm.windex.dump import dump_script_file
 
     parser = argparse.ArgumentParser(description='read smush file')
     parser.add_argument('filename', help='filename to read from')
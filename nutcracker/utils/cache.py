@@ -0,0 +1,104 @@
+import hashlib
+import os
+import tempfile
+from contextlib import suppress
+from pathlib import Path
+
+DEFAULT_MAX_SIZE = 256 << 20
+
+
+class ContentCache:
+    """Content addressed file store bounded by total size.
+
+    Entries are evicted least recently used first,
+    reading an entry refreshes its modification time.
+    """
+
+    def __init__(
+        self,
+        root: str | os.PathLike[str],
+        max_size: int = DEFAULT_MAX_SIZE,
+    ) -> None:
+        self.root = Path(root)
+        self.max_size = max_size
+        self._size: int | None = None
+
+    @staticmethod
+    def key(*parts: bytes | str) -> str:
+        hasher = hashlib.blake2b(digest_size=20)
+        for part in parts:
+            data = part.encode() if isinstance(part, str) else part
+            hasher.update(len(data).to_bytes(8, byteorder='little'))
+            hasher.update(data)
+        return hasher.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key[2:]
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+        # concurrent writers of the same entry never share the temporary file
+        stream = tempfile.NamedTemporaryFile(  # noqa: SIM115
+            dir=path.parent,
+            prefix=f'{path.name}.',
+            suffix='.tmp',
+            delete=False,
+        )
+        try:
+            with stream:
+                stream.write(data)
+            os.replace(stream.name, path)
+        except BaseException:
+            with suppress(OSError):
+                os.unlink(stream.name)
+            raise
+        if self._size is not None:
+            self._size += len(data) - replaced
+        if self.size() > self.max_size:
+            self.prune()
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.root.glob('??/*'):
+            if path.suffix == '.tmp':
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        return self._size
+
+    def prune(self, max_size: int | None = None) -> None:
+        """Remove least recently used entries until total size fits."""
+        max_size = self.max_size if max_size is None else max_size
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= max_size:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+        self._size = total
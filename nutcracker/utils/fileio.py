@@ -1,5 +1,6 @@
-__all__ = ('read_file', 'write_file')
+__all__ = ('read_file', 'write_file', 'write_stream')
 
+from collections.abc import Iterable
 from pathlib import Path
 
 from nutcracker.chiper import xor
@@ -9,3 +10,13 @@ from nutcracker.kernel2.fileio import read_file
 def write_file(path: str, data: bytes, key: int = 0x00) -> int:
     with Path(path).open('wb') as res:
         return xor.write(res, data, key=key)
+
+
+def write_stream(
+    path: str,
+    chunks: Iterable[xor.Data],
+    key: int = 0x00,
+    workers: int = 1,
+) -> int:
+    with Path(path).open('wb') as res:
+        return xor.write_stream(res, chunks, key=key, workers=workers)
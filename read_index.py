@@ -2,14 +2,22 @@ import os
 from pathlib import Path
 
 from nutcracker.kernel2.fileio import ResourceFile
+from nutcracker.kernel2.index import FileStamp, cached_schema, index_key
 from nutcracker.sputm.preset import sputm
+from nutcracker.sputm.schema import SCHEMA
 
 from PyQt6.QtWidgets import QTreeWidgetItem
 from PyQt6.QtCore import Qt
 
 def open_game_resource(filename: str | os.PathLike[str]):
     with ResourceFile.load(filename, key=0x00) as resource:
-        schema = sputm.generate_schema(resource)
+        schema = cached_schema(
+            sputm,
+            resource,
+            f'{filename}.{index_key(sputm, 0x00)}.schema',
+            (FileStamp.from_path(filename),),
+            known=SCHEMA,
+        )
         root = sputm(schema=schema).map_chunks(resource)
         for element in root:
             yield element
@@ -0,0 +1,300 @@
+import io
+import random
+
+import pytest
+
+from nutcracker.sputm.build import (
+    bind_directory_changes,
+    write_dir,
+    write_dir_v8,
+    write_dlfl,
+)
+from nutcracker.sputm.index import (
+    UINT16LE,
+    UINT32LE,
+    DirectoryView,
+    read_directory,
+    read_directory_leg,
+    read_directory_leg_v8,
+    read_directory_table,
+    read_dlfl,
+    read_dlfl_table,
+    read_dobj,
+    read_dobj_he,
+    read_dobj_v7,
+    read_dobj_v8,
+    read_loff_table,
+    write_directory_table,
+    write_dlfl_table,
+    write_loff_table,
+)
+
+SIZES = (0, 1, 7, 300)
+
+
+# previous struct based implementations, kept as reference
+
+
+def legacy_read_directory_leg(data):
+    with io.BytesIO(data) as s:
+        num = int.from_bytes(s.read(2), byteorder='little', signed=False)
+        rnums = [
+            int.from_bytes(s.read(1), byteorder='little', signed=False)
+            for i in range(num)
+        ]
+        offs = [
+            int.from_bytes(s.read(4), byteorder='little', signed=False)
+            for i in range(num)
+        ]
+        return enumerate(zip(rnums, offs, strict=True))
+
+
+def legacy_read_directory_leg_v8(data):
+    with io.BytesIO(data) as s:
+        num = int.from_bytes(s.read(4), byteorder='little', signed=False)
+        rnums = [
+            int.from_bytes(s.read(1), byteorder='little', signed=False)
+            for i in range(num)
+        ]
+        offs = [
+            int.from_bytes(s.read(4), byteorder='little', signed=False)
+            for i in range(num)
+        ]
+        return enumerate(zip(rnums, offs, strict=True))
+
+
+def legacy_read_dlfl(data):
+    with io.BytesIO(data) as s:
+        num = int.from_bytes(s.read(2), byteorder='little', signed=False)
+        offs = [
+            int.from_bytes(s.read(4), byteorder='little', signed=False)
+            for i in range(num)
+        ]
+        return enumerate(offs)
+
+
+def legacy_read_directory(data):
+    with io.BytesIO(data) as s:
+        num = int.from_bytes(s.read(1), byteorder='little', signed=False)
+        return [
+            (
+                int.from_bytes(s.read(1), byteorder='little', signed=False),
+                int.from_bytes(s.read(4), byteorder='little', signed=False),
+            )
+            for i in range(num)
+        ]
+
+
+def legacy_read_dobj(data):
+    with io.BytesIO(data) as s:
+        num = int.from_bytes(s.read(2), byteorder='little', signed=False)
+        values = list(s.read(num))
+        return enumerate((val >> 4, val & 0xFF) for val in values)
+
+
+def legacy_read_dobj_v8(data):
+    with io.BytesIO(data) as s:
+        num = int.from_bytes(s.read(4), byteorder='little', signed=False)
+        for i in range(num):
+            name = s.read(40).split(b'\0')[0].decode()
+            state = ord(s.read(1))
+            room = ord(s.read(1))
+            obj_class = int.from_bytes(s.read(4), byteorder='little', signed=False)
+            yield name, (i, state, room, obj_class)
+
+
+def legacy_read_dobj_v7(data):
+    with io.BytesIO(data) as s:
+        num = int.from_bytes(s.read(2), byteorder='little', signed=False)
+        states = list(s.read(num))
+        rooms = list(s.read(num))
+        classes = [
+            int.from_bytes(s.read(4), byteorder='little', signed=False)
+            for _ in range(num)
+        ]
+        return enumerate(zip(states, rooms, classes, strict=True))
+
+
+def legacy_read_dobj_he(data):
+    with io.BytesIO(data) as s:
+        num = int.from_bytes(s.read(2), byteorder='little', signed=False)
+        states = list(s.read(num))
+        owners = list(s.read(num))
+        rooms = list(s.read(num))
+        classes = [
+            int.from_bytes(s.read(4), byteorder='little', signed=False)
+            for _ in range(num)
+        ]
+        return enumerate(zip(states, owners, rooms, classes, strict=True))
+
+
+def legacy_write_dlfl(index):
+    yield len(index).to_bytes(2, byteorder='little', signed=False)
+    yield b''.join(
+        off.to_bytes(4, byteorder='little', signed=False) for off in index.values()
+    )
+
+
+def legacy_write_dir(index, count_size=2):
+    yield len(index).to_bytes(count_size, byteorder='little', signed=False)
+    rooms, offsets = zip(*index.values()) if index else ((), ())
+    yield b''.join(room.to_bytes(1, byteorder='little', signed=False) for room in rooms)
+    yield b''.join(off.to_bytes(4, byteorder='little', signed=False) for off in offsets)
+
+
+def legacy_bind_directory_changes(read, write, orig, mapping):
+    bound = {**dict(read(orig)), **mapping}
+    data = b''.join(write(bound))
+    return data + orig[len(data) :]
+
+
+def u8(value):
+    return value.to_bytes(1, byteorder='little', signed=False)
+
+
+def u16(value):
+    return value.to_bytes(2, byteorder='little', signed=False)
+
+
+def u32(value):
+    return value.to_bytes(4, byteorder='little', signed=False)
+
+
+def make_directory(rng, num, count=u16):
+    rooms = [rng.randrange(256) for _ in range(num)]
+    offs = [rng.randrange(1 << 32) for _ in range(num)]
+    return count(num) + bytes(rooms) + b''.join(map(u32, offs))
+
+
+def make_dlfl(rng, num):
+    return u16(num) + b''.join(u32(rng.randrange(1 << 32)) for _ in range(num))
+
+
+@pytest.mark.parametrize('num', SIZES)
+def test_directory_matches_legacy(num):
+    data = make_directory(random.Random(num), num)
+    assert list(read_directory_leg(data)) == list(legacy_read_directory_leg(data))
+    assert write_directory_table(*read_directory_table(data)) == data
+
+
+@pytest.mark.parametrize('num', SIZES)
+def test_directory_v8_matches_legacy(num):
+    data = make_directory(random.Random(num), num, count=u32)
+    assert list(read_directory_leg_v8(data)) == list(legacy_read_directory_leg_v8(data))
+    rooms, offs = read_directory_table(data, UINT32LE)
+    assert write_directory_table(rooms, offs, UINT32LE) == data
+
+
+@pytest.mark.parametrize('num', SIZES)
+def test_dlfl_matches_legacy(num):
+    data = make_dlfl(random.Random(num), num)
+    assert list(read_dlfl(data)) == list(legacy_read_dlfl(data))
+    assert write_dlfl_table(read_dlfl_table(data)) == data
+
+
+@pytest.mark.parametrize('num', SIZES)
+def test_write_index_matches_legacy(num):
+    rng = random.Random(num)
+    dlfl = {idx: rng.randrange(1 << 32) for idx in range(num)}
+    dirs = {idx: (rng.randrange(256), rng.randrange(1 << 32)) for idx in range(num)}
+    assert b''.join(write_dlfl(dlfl)) == b''.join(legacy_write_dlfl(dlfl))
+    assert b''.join(write_dir(dirs)) == b''.join(legacy_write_dir(dirs))
+    assert b''.join(write_dir_v8(dirs)) == b''.join(legacy_write_dir(dirs, 4))
+
+
+@pytest.mark.parametrize('num', SIZES)
+def test_bind_directory_changes_matches_legacy(num):
+    rng = random.Random(num)
+    # trailing bytes after the directory are kept
+    orig = make_directory(rng, num) + b'\x00' * 3
+    mapping = {
+        **{
+            rng.randrange(num): (rng.randrange(256), rng.randrange(1 << 32))
+            for _ in range(num // 2)
+        },
+        num: (1, 2),
+        num + 1: (3, 4),
+    }
+    new = bind_directory_changes(
+        lambda data: read_directory_table(data, UINT16LE),
+        lambda *columns: write_directory_table(*columns, UINT16LE),
+        orig,
+        mapping,
+    )
+    legacy = legacy_bind_directory_changes(
+        legacy_read_directory_leg,
+        legacy_write_dir,
+        orig,
+        mapping,
+    )
+    assert new == legacy
+
+    dlfl = make_dlfl(rng, num)
+    mapping = {idx: rng.randrange(1 << 32) for idx in range(0, num + 2, 3)}
+    new = bind_directory_changes(
+        lambda data: (read_dlfl_table(data),),
+        write_dlfl_table,
+        dlfl,
+        mapping,
+    )
+    legacy = legacy_bind_directory_changes(
+        legacy_read_dlfl,
+        legacy_write_dlfl,
+        dlfl,
+        mapping,
+    )
+    assert new == legacy
+
+
+@pytest.mark.parametrize('num', SIZES[:-1])
+def test_loff_matches_legacy(num):
+    rng = random.Random(num)
+    data = u8(num) + b''.join(
+        u8(rng.randrange(256)) + u32(rng.randrange(1 << 32)) for _ in range(num)
+    )
+    assert read_directory(data) == legacy_read_directory(data)
+    assert write_loff_table(read_loff_table(data)) == data
+
+
+@pytest.mark.parametrize('num', SIZES)
+def test_dobj_matches_legacy(num):
+    rng = random.Random(num)
+    states = bytes(rng.randrange(256) for _ in range(num))
+    rooms = bytes(rng.randrange(256) for _ in range(num))
+    owners = bytes(rng.randrange(256) for _ in range(num))
+    classes = b''.join(u32(rng.randrange(1 << 32)) for _ in range(num))
+
+    data = u16(num) + states
+    assert list(read_dobj(data)) == list(legacy_read_dobj(data))
+
+    data = u16(num) + states + rooms + classes
+    assert list(read_dobj_v7(data)) == list(legacy_read_dobj_v7(data))
+
+    data = u16(num) + states + owners + rooms + classes
+    assert list(read_dobj_he(data)) == list(legacy_read_dobj_he(data))
+
+    data = u32(num) + b''.join(
+        f'obj{idx}'.encode().ljust(40, b'\0')
+        + u8(states[idx])
+        + u8(rooms[idx])
+        + u32(rng.randrange(1 << 32))
+        for idx in range(num)
+    )
+    assert list(read_dobj_v8(data)) == list(legacy_read_dobj_v8(data))
+
+
+def test_directory_view_mapping():
+    data = make_directory(random.Random(0), 10)
+    view = DirectoryView(*read_directory_table(data))
+    legacy = dict(legacy_read_directory_leg(data))
+    assert len(view) == len(legacy)
+    assert list(view) == list(legacy)
+    assert dict(view.items()) == legacy
+    assert list(view.pairs()) == list(legacy.items())
+    assert view[3] == legacy[3]
+    assert all(isinstance(value, int) for value in view[3])
+    with pytest.raises(KeyError):
+        view[10]
+    with pytest.raises(KeyError):
+        view[-1]
+    assert view.get(10) is None